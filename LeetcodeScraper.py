@@ -15,16 +15,21 @@ from downloaders.SolutionDownloader import SolutionDownloader
 from downloaders.SubmissionDownloader import SubmissionDownloader
 
 from api.CachedRequest import CachedRequest
+from api.OfflineRequest import OfflineRequest
 from api.ApiManager import ApiManager
 
+from utils.CompanyIndex import CompanyIndex
+from utils.SearchIndex import SearchIndex
 from utils.Config import Config
 from utils.Constants import Constants
 from utils.Util import Util
 from utils.ConfigLoader import ConfigLoader
 from utils.PdfConverter import PdfConverter
 
-def init(logger: Logger):
+def init(logger: Logger, offline: bool = False):
     config = ConfigLoader.load_config()
+    if offline:
+        config.offline_mode = True
 
     if config.logging_level:
         logger.setLevel(str.upper(config.logging_level))
@@ -32,11 +37,21 @@ def init(logger: Logger):
     Constants.LEETCODE_HEADERS = Constants.create_headers(config.leetcode_cookie)
     cache = Cache(
         directory=config.cache_directory)
+
+    if config.cache_api_calls:
+        Util.set_markdown_cache(cache)
     
-    cached_req = CachedRequest(
-        config=config,
-        logger=logger,
-        cache=cache)
+    if config.offline_mode:
+        logger.debug("Offline mode, requests are served from cache only")
+        cached_req = OfflineRequest(
+            config=config,
+            logger=logger,
+            cache=cache)
+    else:
+        cached_req = CachedRequest(
+            config=config,
+            logger=logger,
+            cache=cache)
 
     leetapi = ApiManager(
         config=config,
@@ -74,6 +89,14 @@ def init(logger: Logger):
         logger=logger,
         leetapi=leetapi)
 
+    company_index = CompanyIndex(
+        config=config,
+        logger=logger)
+
+    search_index = SearchIndex(
+        config=config,
+        logger=logger)
+
     question = QuestionDownloader(
         config=config,
         logger=logger,
@@ -81,7 +104,9 @@ def init(logger: Logger):
         solutiondownloader=solution,
         imagedownloader=imgd,
         submissiondownloader=submission,
-        ai_solution_generator=ai_solution_generator)
+        ai_solution_generator=ai_solution_generator,
+        company_index=company_index,
+        search_index=search_index)
     
     cards = CardsDownloader(
         config=config,
@@ -96,7 +121,8 @@ def init(logger: Logger):
         config=config,
         logger=logger,
         leetapi=leetapi,
-        questiondownloader=question)
+        questiondownloader=question,
+        company_index=company_index)
 
 
     return config, cache, cards, company, question, submission
@@ -2,6 +2,8 @@ from logging import Logger
 import os
 
 from LeetcodeScraper import init
+from downloaders.CatalogExporter import CatalogExporter
+from downloaders.OfflineRenderer import OfflineRenderer
 from utils.Config import Config
 from utils.Util import Util
 from utils.ConfigLoader import ConfigLoader
@@ -36,6 +38,12 @@ def main(logger: Logger):
 12: Get cache by key
 13: Delete cache by key
 14: Clear cache
+
+15: Re-render all questions, cards and companies from cache (offline)
+
+16: Generate missing AI solutions in one batch
+17: Search downloaded questions
+18: Export questions, companies and submissions catalog (Parquet/Arrow)
                   
 Press any to quit
                 """)
@@ -51,7 +59,7 @@ Press any to quit
 
             if choice > 1:
                 try:
-                    config, cache, cards, company, qued, submission = init(logger)
+                    config, cache, cards, company, qued, submission = init(logger, offline=(choice == 15))
                 except Exception as e:
                     logger.error(f"Initilization error {e}")
                     continue
@@ -121,9 +129,34 @@ Press any to quit
                 cache.delete(key=key)
             elif choice == 14:
                 cache.clear()
+            elif choice == 15:
+                renderer = OfflineRenderer(
+                    config=config,
+                    logger=logger,
+                    questiondownloader=qued,
+                    cardsdownloader=cards,
+                    companydownloader=company)
+                renderer.render_all()
+            elif choice == 16:
+                qued.generate_missing_ai_solutions()
+            elif choice == 17:
+                query = input("Enter search: ")
+                for question_id, title, path, snippet in qued.search_index.search(query):
+                    print(f"{question_id}. {title} ({os.path.join(config.questions_directory, path)})\n    {' '.join(snippet.split())}")
+            elif choice == 18:
+                exporter = CatalogExporter(
+                    config=config,
+                    logger=logger,
+                    leetapi=qued.lc,
+                    company_index=company.company_index)
+                exporter.export_all()
             else:
                 break
 
+            # Queued AI solutions still update their pages, the download is done once they are in
+            if choice > 1:
+                qued.wait_for_ai_solutions()
+
             if previous_choice != 0:
                 break
         except KeyboardInterrupt:
@@ -6,6 +6,8 @@ import sys
 import os
 
 from LeetcodeScraper import init
+from downloaders.CatalogExporter import CatalogExporter
+from downloaders.OfflineRenderer import OfflineRenderer
 from utils.Util import Util
 
 
@@ -247,7 +249,9 @@ class LeetcodeScraperGUI:
         self.add_labeled_dropdown_field(download_frame, "download_videos", "Download Videos:", 
                                        download_options)
         self.add_checkbox_field(download_frame, "include_default_code", "Download Default Code")
+        self.add_checkbox_field(download_frame, "build_search_index", "Build Search Index (search box in questions/index.html)")
         self.add_number_field(download_frame, "include_submissions_count", "Number of your code submissions to include in question content:")
+        self.add_checkbox_field(download_frame, "incremental_submission_sync", "Only download submissions made since the last sync")
         
         ttk.Separator(parent, orient='horizontal').pack(fill='x', pady=10)
         
@@ -267,6 +271,10 @@ class LeetcodeScraperGUI:
         # AI Solution Settings        
         self.add_dropdown_field(solution_frame, "ai_solution_generator", "AI Solution Generator (when official solution is not available):", 
                                ["None", "openai", "ollama"])
+        self.add_number_field(solution_frame, "threads_count_for_ai_solutions", "Number of AI solutions to generate in parallel (0 to wait for each):")
+        self.add_checkbox_field(solution_frame, "ai_solution_streaming", "Stream AI solutions (keeps partial output when interrupted)")
+        self.add_checkbox_field(solution_frame, "ai_solution_log_stream", "Show AI solutions in the log as they are generated")
+        self.add_number_field(solution_frame, "ai_solution_timeout_minutes", "AI solution timeout (minutes):")
         
         # OpenAI Settings
         self.openai_subframe = ttk.LabelFrame(solution_frame, text="OpenAI Settings", padding="5")
@@ -286,6 +294,8 @@ class LeetcodeScraperGUI:
         self.ollama_subframe.pack(fill='x', pady=5)
         self.add_text_field(self.ollama_subframe, "ollama_url", "URL:")
         self.add_editable_dropdown_field(self.ollama_subframe, "ollama_model", "Model:", width=30)
+        self.add_text_field(self.ollama_subframe, "ollama_keep_alive", "Keep model loaded for (e.g. 30m):")
+        self.add_number_field(self.ollama_subframe, "ollama_parallel_requests", "Parallel requests (OLLAMA_NUM_PARALLEL):")
         
         # Add callback to fetch models when Ollama URL is entered
         ollama_url_var = self.config_vars.get("ollama_url")
@@ -323,7 +333,26 @@ class LeetcodeScraperGUI:
         advanced_frame.pack(fill='x', padx=10, pady=5)
         
         self.add_number_field(advanced_frame, "threads_count_for_pdf_conversion", "Number of threads to use for PDF conversion:")
+        self.add_number_field(advanced_frame, "threads_count_for_rendering", "Number of threads to use for offline re-rendering:")
+        self.add_labeled_dropdown_field(advanced_frame, "pdf_failure_action", "Previously failed PDF conversions:", [
+            ("retry", "Retry full conversion"),
+            ("skip", "Skip until the HTML changes"),
+            ("degraded", "Convert without images and math (Default)")
+        ])
+        self.add_labeled_dropdown_field(advanced_frame, "company_files_link_method", "Company folder files:", [
+            ("copy", "Copy"),
+            ("hardlink", "Hardlink (Default)"),
+            ("reflink", "Reflink (copy-on-write filesystems)"),
+            ("symlink", "Symlink")
+        ])
+        self.add_labeled_dropdown_field(advanced_frame, "catalog_format", "Catalog export format:", [
+            ("parquet", "Parquet (Default)"),
+            ("arrow", "Arrow IPC (memory mappable)")
+        ])
         self.add_number_field(advanced_frame, "api_max_failures", "Maximum number of retries for API call failures:")
+        self.add_number_field(advanced_frame, "threads_count_for_api_calls", "Number of threads to use for API calls:")
+        self.add_number_field(advanced_frame, "api_requests_per_second", "Maximum API requests per second (0 for no limit):")
+        self.add_checkbox_field(advanced_frame, "api_streaming_json", "Decode large API responses while they download (needs ijson)")
         self.add_dropdown_field(advanced_frame, "logging_level", "Logging level:", 
                                ["debug", "info", "warning", "error"])
 
@@ -336,6 +365,7 @@ class LeetcodeScraperGUI:
         
         self.add_checkbox_field(cache_frame, "cache_api_calls", "Cache API Calls")
         self.add_number_field(cache_frame, "cache_expiration_days", "Cache Expiration (days):")
+        self.add_checkbox_field(cache_frame, "offline_mode", "Offline Mode (serve everything from cache)")
         
         ttk.Separator(parent, orient='horizontal').pack(fill='x', pady=10)
         
@@ -935,6 +965,7 @@ class LeetcodeScraperGUI:
         all_questions_frame2.pack(pady=5)
         ttk.Button(all_questions_frame2, text="Generate Index", command=self.generate_question_index, width=30).pack(side='left', padx=5)
         ttk.Button(all_questions_frame2, text="Refresh Question List", command=self.refresh_question_list, width=30).pack(side='left', padx=5)
+        ttk.Button(all_questions_frame2, text="Generate Missing AI Solutions", command=self.generate_missing_ai_solutions, width=30).pack(side='left', padx=5)
         
         ttk.Separator(parent, orient='horizontal').pack(fill='x', pady=10)
         
@@ -1800,6 +1831,8 @@ class LeetcodeScraperGUI:
         ttk.Button(cache_buttons_frame, text="Delete", command=self.delete_cache).pack(side='left', padx=2)
         
         ttk.Button(parent, text="Clear All Cache", command=self.clear_cache).pack(pady=5)
+        ttk.Button(parent, text="Re-render All From Cache (Offline)", command=self.rerender_from_cache).pack(pady=5)
+        ttk.Button(parent, text="Export Catalog (Parquet/Arrow)", command=self.export_catalog).pack(pady=5)
         
         # Info text
         info_frame = ttk.Frame(parent)
@@ -1815,6 +1848,10 @@ class LeetcodeScraperGUI:
             try:
                 self.status_var.set("Running...")
                 func()
+                # Queued AI solutions still update their pages, the task is done once they are in
+                if self.qued:
+                    self.status_var.set("Waiting for AI solutions...")
+                    self.qued.wait_for_ai_solutions()
                 self.status_var.set("Completed successfully")
             except Exception as e:
                 self.logger.error(f"Error: {e}")
@@ -3521,6 +3558,36 @@ class LeetcodeScraperGUI:
                 self.load_cache_keys(show_message=False)
             self.run_in_thread(task)
 
+    def generate_missing_ai_solutions(self):
+        def task():
+            self.initialize_components()
+            self.qued.generate_missing_ai_solutions()
+        self.run_in_thread(task)
+
+    def export_catalog(self):
+        def task():
+            self.initialize_components()
+            exporter = CatalogExporter(
+                config=self.config,
+                logger=self.logger,
+                leetapi=self.qued.lc,
+                company_index=self.company.company_index)
+            exporter.export_all()
+        self.run_in_thread(task)
+
+    def rerender_from_cache(self):
+        def task():
+            # Separate offline components, the shared ones may still be used for online downloads
+            config, _, cards, company, qued, _ = init(self.logger, offline=True)
+            renderer = OfflineRenderer(
+                config=config,
+                logger=self.logger,
+                questiondownloader=qued,
+                cardsdownloader=cards,
+                companydownloader=company)
+            renderer.render_all()
+        self.run_in_thread(task)
+
 
 def main():
     root = tk.Tk()
@@ -1,4 +1,7 @@
+from concurrent.futures import ThreadPoolExecutor
 from logging import Logger
+from threading import Lock
+import time
 
 from diskcache import Cache
 
@@ -19,19 +22,159 @@ class AISolution:
         self.cache = cache
         self.prompt_gen = None
 
+        # Generation queue, created on first use
+        self.executor = None
+        self.pending = {}  # question id -> callbacks to run once the solution is cached
+        self.queue_lock = Lock()
+
     def submit(self, text):
-        raise NotImplemented("Method not implemented")
+        raise NotImplementedError("Method not implemented")
+
+    def stream(self, text):
+        """Yields the response text in chunks as the model produces it."""
+        raise NotImplementedError("Method not implemented")
     
     def generate_solution(self, quesion: Question, question_content: QuestionContent):
         full_text = self.prompt_gen.get_prompt(quesion, question_content)
 
+        if self.config.ai_solution_streaming:
+            return self.submit_streaming(quesion, full_text)
+
         response = self.submit(full_text)
         return response
 
-    def get_solution(self, quesion: Question, question_content: QuestionContent):
-        key = f"question-{quesion.id}-solution-{self.config.ai_solution_generator}"
+    def submit_streaming(self, question: Question, text):
+        """Collects the streamed response, saving what has arrived so far under the partial cache key.
+        
+        A failed or timed out generation keeps its partial output in the cache and returns None.
+        """
+        partial_key = self.get_partial_key(question)
+        deadline = time.monotonic() + self.config.ai_solution_timeout_minutes * 60
+        last_saved = time.monotonic()
+        chunks = []
+        line = ""
+
+        try:
+            for chunk in self.stream(text):
+                chunks.append(chunk)
+
+                if self.config.ai_solution_log_stream:
+                    # The log is line based, print each line once it is complete
+                    lines = (line + chunk).split("\n")
+                    for complete_line in lines[:-1]:
+                        self.logger.info(f"[AI {question.id}] {complete_line}")
+                    line = lines[-1]
+
+                now = time.monotonic()
+                if now - last_saved >= 1:
+                    self.save_partial(partial_key, "".join(chunks))
+                    last_saved = now
+
+                if now > deadline:
+                    raise TimeoutError(f"Generation took longer than {self.config.ai_solution_timeout_minutes} minutes")
+        except Exception as e:
+            self.logger.error(f"AI solution stream failed {question.id}: {e}")
+            partial = "".join(chunks)
+            if partial:
+                self.save_partial(partial_key, partial)
+                self.logger.warning(f"Kept {len(partial)} characters of partial AI solution {question.id}")
+            return None
 
+        if line and self.config.ai_solution_log_stream:
+            self.logger.info(f"[AI {question.id}] {line}")
+
+        if self.config.cache_api_calls:
+            self.cache.delete(partial_key)
+
+        return "".join(chunks)
+
+    def save_partial(self, partial_key, text):
+        if self.config.cache_api_calls:
+            self.cache.set(key=partial_key, value=text)
+
+    def get_partial_key(self, question: Question):
+        return f"{self.get_key(question)}-partial"
+
+    def get_key(self, question: Question):
+        return f"question-{question.id}-solution-{self.config.ai_solution_generator}"
+
+    def is_queue_enabled(self):
+        # Queued results are picked up from the cache, so the queue needs it
+        return self.config.threads_count_for_ai_solutions > 0 and self.config.cache_api_calls and not self.config.offline_mode
+
+    def get_cached_solution(self, question: Question):
         if not self.config.cache_api_calls:
+            return None
+        return self.cache.get(key=self.get_key(question))
+
+    def enqueue(self, question: Question, question_content: QuestionContent, on_ready):
+        """Generate the solution in the background and call on_ready once it is cached.
+        
+        A question already in the queue isn't generated twice, its callbacks are all run.
+        """
+        with self.queue_lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.config.threads_count_for_ai_solutions)
+
+            if question.id in self.pending:
+                self.pending[question.id].append(on_ready)
+                return
+            self.pending[question.id] = [on_ready]
+
+        self.logger.info(f"Queued AI solution {question.id}")
+        self.executor.submit(self.generate_queued, question, question_content)
+
+    def wait(self):
+        """Block until every queued solution is generated and its pages are updated."""
+        with self.queue_lock:
+            executor = self.executor
+            self.executor = None
+
+        if executor is None:
+            return
+
+        if self.pending:
+            self.logger.info(f"Waiting for {len(self.pending)} queued AI solution(s)")
+        executor.shutdown(wait=True)
+
+    def generate_queued(self, question: Question, question_content: QuestionContent):
+        solution = None
+        try:
+            solution = self.get_solution(question, question_content)
+        except Exception as e:
+            self.logger.error(f"AI solution failed {question.id}: {e}")
+
+        with self.queue_lock:
+            callbacks = self.pending.pop(question.id, [])
+
+        if not solution:
+            self.logger.warning(f"AI solution not generated {question.id}")
+            return
+
+        for on_ready in callbacks:
+            try:
+                on_ready()
+            except Exception as e:
+                self.logger.error(f"Error updating page with AI solution {question.id}: {e}")
+
+    def generate_batch(self, items):
+        """Generate the solutions of (question, question_content) items, returns the questions a solution was stored for.
+        
+        Generators without a batch API generate them one by one.
+        """
+        generated = []
+        for question, question_content in items:
+            try:
+                if self.get_solution(question, question_content):
+                    generated.append(question)
+            except Exception as e:
+                self.logger.error(f"AI solution failed {question.id}: {e}")
+        return generated
+
+    def get_solution(self, quesion: Question, question_content: QuestionContent):
+        key = self.get_key(quesion)
+
+        if not self.config.cache_api_calls and not self.config.offline_mode:
             self.logger.debug(f"Cache bypass {key}")
             data = self.generate_solution(quesion, question_content)
             return data
@@ -39,6 +182,10 @@ class AISolution:
         # Check if data exists in the cache and retrieve it
         data = self.cache.get(key=key)
 
+        if data is None and self.config.offline_mode:
+            self.logger.debug(f"Offline cache miss {key}")
+            return None
+
         if data is None:
             self.logger.debug(f"Cache miss {key}")
             data = self.generate_solution(quesion, question_content)
@@ -46,6 +193,11 @@ class AISolution:
             # Store data in the cache
             if data:
                 self.cache.set(key=key, value=data)
+            elif not self.is_queue_enabled():
+                # Show what an interrupted generation produced, it is generated again next time
+                partial = self.cache.get(key=self.get_partial_key(quesion))
+                if partial:
+                    data = f"{partial}\n\n*Incomplete, the generation was interrupted.*"
         else:
             self.logger.debug(f"Cache hit {key}")
 
@@ -0,0 +1,140 @@
+import html
+import math
+import re
+from collections import Counter
+from logging import Logger
+from threading import Lock
+
+from diskcache import Cache
+
+from utils.Config import Config
+
+class ExampleIndex:
+    """BM25 index over the cached questions that have an editorial, to pick few-shot examples for a prompt.
+
+    Built from the `question-<id>` entries of the api cache and stored back in the cache with the term
+    counts of every question and the expire time of its entry, so the next run only tokenizes the
+    questions cached or cached again since.
+    """
+    KEY = "example-index"
+    QUESTION_KEY = re.compile(r"question-(\d+)")
+    SLUG = re.compile(r"/problems/([^/]+)/")
+    TAG = re.compile(r"<[^>]+>")
+    TOKEN = re.compile(r"[a-z][a-z0-9]+")
+    STOP_WORDS = frozenset("""a an and are as at be by can each for from given has have if in into is it its
+        of on or return should that the their then there these this to was which will with you your""".split())
+    # Topic tags describe the question better than its words
+    TAG_WEIGHT = 5
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(
+        self,
+        config: Config,
+        logger: Logger,
+        cache: Cache):
+
+        self.config = config
+        self.logger = logger
+        self.cache = cache
+        self.lock = Lock()
+        self.documents = None  # question id -> (slug, term counts, length), None without editorial
+        self.postings = None
+        self.indexed_count = 0
+        self.average_length = 0
+
+    @staticmethod
+    def tokenize(content, topic_tags=None):
+        text = html.unescape(ExampleIndex.TAG.sub(" ", content or "")).lower()
+        terms = [term for term in ExampleIndex.TOKEN.findall(text) if term not in ExampleIndex.STOP_WORDS]
+
+        for topic_tag in topic_tags or []:
+            terms.extend([f"tag:{topic_tag}"] * ExampleIndex.TAG_WEIGHT)
+
+        return terms
+
+    @staticmethod
+    def get_document(data):
+        if not isinstance(data, dict) or not data.get('solution') or not data['solution'].get('content'):
+            return None
+
+        slug = ExampleIndex.SLUG.search(data.get('submitUrl') or "")
+        if not slug:
+            return None
+
+        topic_tags = [topic_tag['slug'] for topic_tag in data.get('topicTags') or []]
+        terms = Counter(ExampleIndex.tokenize(f"{data.get('title', '')} {data.get('content', '')}", topic_tags))
+        return (slug.group(1), dict(terms), sum(terms.values()))
+
+    #region build
+    def load(self):
+        with self.lock:
+            if self.documents is None:
+                self.build()
+
+    def build(self):
+        stored = self.cache.get(key=ExampleIndex.KEY) or {}  # question id -> (expire time of the entry, document)
+
+        entries = {}
+        for key in self.cache.iterkeys():
+            match = ExampleIndex.QUESTION_KEY.fullmatch(key) if isinstance(key, str) else None
+            if match:
+                data, expire_time = self.cache.get(key=key, expire_time=True)
+                if data is not None:
+                    entries[int(match.group(1))] = (data, expire_time)
+
+        # An entry written again since the last build has a new expire time, only those are tokenized
+        indexed = {}
+        new_ids = set()
+        for question_id, (data, expire_time) in entries.items():
+            stored_entry = stored.get(question_id)
+            if isinstance(stored_entry, tuple) and len(stored_entry) == 2 and stored_entry[0] == expire_time:
+                indexed[question_id] = stored_entry
+            else:
+                indexed[question_id] = (expire_time, ExampleIndex.get_document(data))
+                new_ids.add(question_id)
+
+        if new_ids or len(indexed) != len(stored):
+            self.cache.set(key=ExampleIndex.KEY, value=indexed)
+
+        documents = {question_id: document for question_id, (_, document) in indexed.items()}
+
+        postings = {}
+        total_length = 0
+        for question_id, document in documents.items():
+            if document is None:
+                continue
+            _, terms, length = document
+            total_length += length
+            for term, count in terms.items():
+                postings.setdefault(term, []).append((question_id, count))
+
+        self.documents = documents
+        self.postings = postings
+        self.indexed_count = sum(1 for document in documents.values() if document)
+        self.average_length = total_length / self.indexed_count if self.indexed_count else 0
+
+        self.logger.debug(f"Example index {self.indexed_count} questions with editorial, {len(new_ids)} read from cache")
+    #endregion build
+
+    def search(self, content, topic_tags=None, limit=2, exclude_ids=()):
+        """Up to limit (question id, slug) with an editorial, most similar to the content first."""
+        self.load()
+
+        if not self.postings:
+            return []
+
+        scores = {}
+        for term in set(ExampleIndex.tokenize(content, topic_tags)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+
+            idf = math.log(1 + (self.indexed_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for question_id, count in postings:
+                length = self.documents[question_id][2]
+                norm = ExampleIndex.K1 * (1 - ExampleIndex.B + ExampleIndex.B * length / self.average_length)
+                scores[question_id] = scores.get(question_id, 0) + idf * count * (ExampleIndex.K1 + 1) / (count + norm)
+
+        ranked = sorted((question_id for question_id in scores if question_id not in exclude_ids), key=lambda question_id: scores[question_id], reverse=True)
+        return [(question_id, self.documents[question_id][0]) for question_id in ranked[:limit]]
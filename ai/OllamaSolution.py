@@ -1,7 +1,10 @@
+from concurrent.futures import ThreadPoolExecutor
 import json
 from logging import Logger
+from threading import BoundedSemaphore
 
 from diskcache import Cache
+from requests.adapters import HTTPAdapter
 import requests
 
 from ai.AISolution import AISolution
@@ -20,24 +23,44 @@ class OllamaSolution(AISolution):
         self.prompt_gen = OllamaPrompt(
             config=config,
             logger=logger)
+
+        # One pooled connection per parallel slot of the Ollama server
+        parallel_requests = max(1, self.config.ollama_parallel_requests)
+        self.request_slots = BoundedSemaphore(parallel_requests)
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=parallel_requests))
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=parallel_requests))
         
+    def get_keep_alive(self):
+        # Ollama reads durations without a unit, like -1, as seconds only when they are numbers
+        keep_alive = self.config.ollama_keep_alive
+        if isinstance(keep_alive, str) and keep_alive.strip().lstrip("-").isdigit():
+            return int(keep_alive)
+        return keep_alive
+
+    def get_request_data(self, text, stream):
+        return {
+            'model': self.config.ollama_model,
+            'prompt': text,
+            'stream': stream,
+            'keep_alive': self.get_keep_alive(),
+            'system': 'You are an editor for a blog providing solution in an easy to understand language and step by step approach to programming problems that appear in software engineering job interviews.',
+            'options': {
+                'num_predict': -1
+            }
+        }
+
     def submit(self, text):
         try:
-            data = {
-                'model': self.config.ollama_model,
-                'prompt': text,
-                'stream': False,
-                'system': 'You are an editor for a blog providing solution in an easy to understand language and step by step approach to programming problems that appear in software engineering job interviews.',
-                'options': {
-                    'num_predict': -1
-                }
-            }
+            data = self.get_request_data(text, stream=False)
 
             self.logger.debug(f"Ollama data:\n{json.dumps(data)}")
 
-            response = requests.post(
-                url=self.config.ollama_url,
-                json=data)
+            with self.request_slots:
+                response = self.session.post(
+                    url=self.config.ollama_url,
+                    json=data,
+                    timeout=self.config.ai_solution_timeout_minutes * 60)
             
             response.raise_for_status()
 
@@ -45,4 +68,38 @@ class OllamaSolution(AISolution):
         except Exception as e:
             self.logger.error(f"An error occurred: {e}")
 
+    def stream(self, text):
+        data = self.get_request_data(text, stream=True)
+
+        self.logger.debug(f"Ollama data:\n{json.dumps(data)}")
+
+        # Ollama streams one json object per line, the slot is held until the response is read
+        with self.request_slots, self.session.post(
+            url=self.config.ollama_url,
+            json=data,
+            stream=True,
+            timeout=self.config.ai_solution_timeout_minutes * 60) as response:
+
+            response.raise_for_status()
+
+            for line in response.iter_lines():
+                if not line:
+                    continue
+
+                part = json.loads(line)
+                if part.get('error'):
+                    raise Exception(part['error'])
+
+                if part.get('response'):
+                    yield part['response']
+
+                if part.get('done'):
+                    return
+
+        raise Exception("Ollama stream ended before the response was done")
 
+    def generate_batch(self, items):
+        """Generate the solutions on all the parallel slots of the Ollama server."""
+        with ThreadPoolExecutor(max_workers=max(1, self.config.ollama_parallel_requests)) as executor:
+            generated = executor.map(lambda item: AISolution.generate_batch(self, [item]), items)
+            return [question for questions in generated for question in questions]
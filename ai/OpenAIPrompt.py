@@ -1,5 +1,7 @@
 from logging import Logger
+from threading import Lock
 
+from ai.ExampleIndex import ExampleIndex
 from ai.Prompt import Prompt
 from api.ApiManager import ApiManager
 from models.Question import Question
@@ -8,108 +10,199 @@ from utils.Config import Config
 from utils.Constants import Constants
 
 class OpenAIPrompt(Prompt):
+    DEFAULT_EXAMPLE_QUESTIONS = {
+        "3sum": 15,
+        "unique-paths-ii": 63,
+        "decode-ways": 91
+    }
+    # No community solution is fetched once less than this is left of the prompt budget
+    MIN_COMMUNITY_SOLUTION_TOKENS = 100
+
     def __init__(
         self,
         config: Config,
         logger: Logger,
-        leetapi: ApiManager):
+        leetapi: ApiManager,
+        example_index: ExampleIndex = None):
 
         self.lc = leetapi
+        self.example_index = example_index
+
+        # Built once per run and shared by every prompt
+        self.lock = Lock()
+        self.questions_by_slug = None
+        self.examples = {}
 
         Prompt.__init__(self, config, logger)
         
 
-    def format_example(self, question_content: QuestionContent, id):
-        hint_content = ""
-        for hint in question_content.hints:
-            hint_content +=  f"{hint}\n"
+    def format_example(self, example, id):
+        content, hint_content, solution = example
         example_question_text = f"""Example Question {id}:
-{question_content.content}
+{content}
 
 Example Hint {id}:
 {hint_content}
 
 Example Solution {id}:
-{question_content.solution}"""
+{solution}"""
 
         return example_question_text
 
-    def generate_examples_from_similar_questions(self, question_content: QuestionContent, limit):
-        example_text = ""
-        questions = self.lc.get_all_questions()
+    def get_questions_by_slug(self):
+        with self.lock:
+            if self.questions_by_slug:
+                return self.questions_by_slug
 
-        if len(questions) == 0:
-            return example_text, 0
+        questions = {question.slug: question for question in self.lc.get_all_questions()}
 
-        questions = {question.slug: question for question in questions}
-        count = 0
-        for similar_question in question_content.similar_questions:
-            title_slug = similar_question['titleSlug']
-            if title_slug in questions.keys():
-                question = questions[title_slug]
-                question_content_data = self.lc.get_question(question.id, question.slug)
-                question_content = QuestionContent.from_json(question_content_data)
-
-                if question_content.solution:
-                    count += 1
-                    example_text += self.format_example(question_content, count) + "\n\n"
-            if count >= limit:
-                break
+        with self.lock:
+            self.questions_by_slug = questions
+        return questions
+
+    def get_example(self, id, slug):
+        """(content, hints, solution) of a question to use as an example, None if it has no solution."""
+        with self.lock:
+            if slug in self.examples:
+                return self.examples[slug]
 
-        return example_text, count
+        question_content_data = self.lc.get_question(id, slug)
+        question_content = QuestionContent.from_json(question_content_data)
 
-    def generate_examples_from_default_questions(self, limit):
+        example = None
+        if question_content.solution:
+            hint_content = ""
+            for hint in question_content.hints:
+                hint_content +=  f"{hint}\n"
+            example = (question_content.content, hint_content, question_content.solution)
+
+        with self.lock:
+            self.examples[slug] = example
+        return example
+
+    def add_examples(self, candidates, limit, start, token_budget):
+        """Format the examples of (id, slug) candidates that have a solution and fit in the token budget."""
         example_text = ""
-        questions = {
-            "3sum": 15,
-            "unique-paths-ii": 63,
-            "decode-ways": 91
-        }
-        
         count = 0
-        for slug, id in questions.items():
-            question_content_data = self.lc.get_question(id, slug)
-            question_content = QuestionContent.from_json(question_content_data)
+        tokens = 0
 
-            if question_content.solution:
-                count += 1
-                example_text += self.format_example(question_content, count) + "\n\n"
+        for id, slug in candidates:
             if count >= limit:
                 break
 
-        return example_text, count
+            example = self.get_example(id, slug)
+            if not example:
+                continue
+
+            example_block = self.format_example(example, start + count + 1) + "\n\n"
+            example_tokens = self.estimate_tokens(example_block)
+            if token_budget is not None and tokens + example_tokens > token_budget:
+                self.logger.debug(f"Example {slug} skipped, {example_tokens} tokens over the prompt budget")
+                continue
+
+            count += 1
+            tokens += example_tokens
+            example_text += example_block
+
+        return example_text, count, tokens
+
+    def get_similar_questions(self, question_content: QuestionContent):
+        questions = self.get_questions_by_slug()
 
-    def generate_examples(self, question_content: QuestionContent, limit):
-        example_text, count = self.generate_examples_from_similar_questions(question_content, limit)
+        candidates = []
+        for similar_question in question_content.similar_questions:
+            title_slug = similar_question['titleSlug']
+            if title_slug in questions:
+                candidates.append((questions[title_slug].id, title_slug))
+
+        return candidates
+
+    def generate_examples_from_similar_questions(self, question_content: QuestionContent, limit, token_budget=None):
+        candidates = self.get_similar_questions(question_content)
+        return self.add_examples(candidates, limit, 0, token_budget)
+
+    def generate_examples_from_retrieved_questions(self, question: Question, question_content: QuestionContent, limit, start=0, token_budget=None):
+        """Examples from the cached questions with editorial most similar to the question."""
+        if not self.example_index:
+            return "", 0, 0
+
+        exclude_ids = {question.id} | {id for id, _ in self.get_similar_questions(question_content)}
+        # A few extra candidates in case some don't fit in the token budget
+        candidates = self.example_index.search(
+            f"{question_content.title} {question_content.content}",
+            question_content.topic_tags,
+            limit=limit * 3,
+            exclude_ids=exclude_ids)
+
+        return self.add_examples(candidates, limit, start, token_budget)
+
+    def generate_examples_from_default_questions(self, limit, start=0, token_budget=None):
+        candidates = [(id, slug) for slug, id in OpenAIPrompt.DEFAULT_EXAMPLE_QUESTIONS.items()]
+        return self.add_examples(candidates, limit, start, token_budget)
+
+    def generate_examples(self, question: Question, question_content: QuestionContent, limit, token_budget=None):
+        example_text, count, tokens = self.generate_examples_from_similar_questions(question_content, limit, token_budget)
         if count < limit:
-            default_example_text, default_count = self.generate_examples_from_default_questions(limit-count)
+            retrieved_budget = None if token_budget is None else token_budget - tokens
+            retrieved_example_text, retrieved_count, retrieved_tokens = self.generate_examples_from_retrieved_questions(question, question_content, limit-count, count, retrieved_budget)
+            example_text = example_text + retrieved_example_text
+            count += retrieved_count
+            tokens += retrieved_tokens
+        if count < limit:
+            default_budget = None if token_budget is None else token_budget - tokens
+            default_example_text, default_count, default_tokens = self.generate_examples_from_default_questions(limit-count, count, default_budget)
             example_text = example_text + "\n\n" + default_example_text
             count += default_count
-        return example_text, count
+            tokens += default_tokens
+        return example_text, count, tokens
 
-    def generate_community_solutions(self, question: Question, limit):
+    def generate_community_solutions(self, question: Question, limit, token_budget=None):
         community_solution_text = ""
+        if token_budget is not None and token_budget < OpenAIPrompt.MIN_COMMUNITY_SOLUTION_TOKENS:
+            return community_solution_text, 0
+
         community_solutions = self.lc.get_all_community_solutions(question.slug)
 
         if len(community_solutions) == 0:
             return community_solution_text, 0
     
         count = 0
+        tokens = 0
         for community_solution in community_solutions:
+            if token_budget is not None and token_budget - tokens < OpenAIPrompt.MIN_COMMUNITY_SOLUTION_TOKENS:
+                self.logger.debug(f"Community solutions stopped, {token_budget - tokens} tokens left of the prompt budget")
+                break
+
             community_solution_content = self.lc.get_community_solution_content(int(community_solution['id']))
             if community_solution_content:
+                community_solution_block = f"""Community Solution {count + 1}:\n{community_solution_content}\n\n"""
+                community_solution_tokens = self.estimate_tokens(community_solution_block)
+                # Solutions are about the same size, the next ones wouldn't fit either
+                if token_budget is not None and tokens + community_solution_tokens > token_budget:
+                    self.logger.debug(f"Community solutions stopped at {community_solution['id']}, {community_solution_tokens} tokens over the prompt budget")
+                    break
+
                 count += 1
-                community_solution_text += f"""Community Solution {count}:\n{community_solution_content}\n\n"""
+                tokens += community_solution_tokens
+                community_solution_text += community_solution_block
             if count >= limit:
                 break
 
         return community_solution_text, count
 
     def get_intial_prompt(self, question: Question, question_content: QuestionContent):
-        example_text, count = self.generate_examples(question_content, 2)
+        token_budget = None
+        if self.config.open_ai_prompt_max_tokens > 0:
+            token_budget = self.config.open_ai_prompt_max_tokens - self.estimate_tokens(Constants.OPEN_AI_PROMPT) - self.estimate_tokens(question_content.content)
+
+            hint_tokens = sum(self.estimate_tokens(hint) for hint in question_content.hints)
+            token_budget = max(0, token_budget - hint_tokens)
+
+        example_text, count, tokens = self.generate_examples(question, question_content, 2, token_budget)
         self.logger.debug(f"Examples generated {count}")
 
-        community_solution, comsol_count = self.generate_community_solutions(question, 3)
+        community_budget = None if token_budget is None else token_budget - tokens
+        community_solution, comsol_count = self.generate_community_solutions(question, 3, community_budget)
         self.logger.debug(f"Community solution generated {comsol_count}")
         
         prompt = f"""{Constants.OPEN_AI_PROMPT}
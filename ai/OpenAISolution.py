@@ -1,14 +1,27 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from logging import Logger
+import json
+import os
+import tempfile
+import time
 
 from diskcache import Cache
 from openai import OpenAI
 
 from ai.AISolution import AISolution
+from ai.ExampleIndex import ExampleIndex
 from ai.OpenAIPrompt import OpenAIPrompt
 from api.ApiManager import ApiManager
 from utils.Config import Config
 
 class OpenAISolution(AISolution):
+    BATCH_ENDPOINT = "/v1/chat/completions"
+    BATCH_MAX_REQUESTS = 50000
+    BATCH_MAX_BYTES = 200 * 1024 * 1024
+    BATCH_DONE_STATUSES = ("completed", "failed", "expired", "cancelled")
+    # Batches submitted but not ingested yet, picked up again by the next run
+    PENDING_BATCHES_KEY = "openai-batches-pending"
+
     def __init__(
         self,
         config: Config,
@@ -17,33 +30,202 @@ class OpenAISolution(AISolution):
         cache: Cache):
 
         AISolution.__init__(self, config, logger, cache)       
-        self.client = OpenAI(api_key=self.config.open_ai_api_key)
+        self.client = OpenAI(
+            api_key=self.config.open_ai_api_key,
+            base_url=self.config.open_ai_base_url or None)
         self.prompt_gen = OpenAIPrompt(
             config=config,
             logger=logger,
-            leetapi=leetapi)
+            leetapi=leetapi,
+            example_index=ExampleIndex(config=config, logger=logger, cache=cache) if self.config.open_ai_retrieved_examples else None)
+
+
+    def get_request_args(self, text):
+        return dict(
+            **self.get_request_body(text),
+            timeout=self.config.ai_solution_timeout_minutes * 60)
 
+    def get_request_body(self, text):
+        return dict(
+            model=self.config.open_ai_model,
+            messages=[{
+                "role": "user",
+                "content": [{
+                    "type": "text",
+                    "text": text
+                    }
+                ]}],
+            temperature=1,
+            max_completion_tokens=16384,
+            top_p=1,
+            frequency_penalty=0,
+            presence_penalty=0,
+            response_format={
+                "type": "text"
+            })
 
     def submit(self, text):
         try:
-            response = self.client.chat.completions.create(
-                model=self.config.open_ai_model,
-                messages=[{
-                    "role": "user",
-                    "content": [{
-                        "type": "text",
-                        "text": text
-                        }
-                    ]}],
-                temperature=1,
-                max_completion_tokens=16384,
-                top_p=1,
-                frequency_penalty=0,
-                presence_penalty=0,
-                response_format={
-                    "type": "text"
-                })
+            response = self.client.chat.completions.create(**self.get_request_args(text))
 
             return response.choices[0].message.content
         except Exception as e:
             self.logger.error(f"An error occurred: {e}")
+
+    def stream(self, text):
+        response = self.client.chat.completions.create(
+            **self.get_request_args(text),
+            stream=True)
+
+        for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    #region batch
+    def generate_batch(self, items):
+        """Generate the solutions through the Batch API, one job for all the prompts.
+
+        items: list of (question, question_content). Solutions are stored under the same cache keys as get_solution.
+        Returns the questions a solution was stored for.
+        """
+        if not self.config.cache_api_calls or self.config.offline_mode:
+            self.logger.error("Batch AI solutions are stored in the cache, enable cache_api_calls and disable offline_mode")
+            return []
+
+        questions = {self.get_key(question): question for question, _ in items}
+        generated_keys = []
+
+        # A previous run may have stopped while its batch was still running
+        for batch_id in list(self.cache.get(key=OpenAISolution.PENDING_BATCHES_KEY, default=[])):
+            self.logger.info(f"Resuming AI solution batch {batch_id}")
+            generated_keys.extend(self.complete_batch(batch_id))
+
+        items = [(question, question_content) for question, question_content in items if self.cache.get(key=self.get_key(question)) is None]
+        for batch_lines in self.split_batch_lines(self.get_batch_requests(items)):
+            batch_id = self.submit_batch(batch_lines)
+            if batch_id:
+                generated_keys.extend(self.complete_batch(batch_id))
+
+        return [questions[key] for key in generated_keys if key in questions]
+
+    def get_batch_requests(self, items):
+        requests = []
+
+        with ThreadPoolExecutor(max_workers=self.config.threads_count_for_api_calls) as executor:
+            future_to_question = {executor.submit(self.prompt_gen.get_prompt, question, question_content): question for question, question_content in items}
+            for future in as_completed(future_to_question):
+                question = future_to_question[future]
+                try:
+                    requests.append({
+                        "custom_id": self.get_key(question),
+                        "method": "POST",
+                        "url": OpenAISolution.BATCH_ENDPOINT,
+                        "body": self.get_request_body(future.result())
+                    })
+                except Exception as e:
+                    self.logger.error(f"Error creating AI solution prompt {question.id}: {e}")
+
+        return requests
+
+    def split_batch_lines(self, requests):
+        """Input file lines of the requests, split to stay under the request count and file size limits of a batch."""
+        batch_lines = []
+        batch_bytes = 0
+
+        for request in requests:
+            line = (json.dumps(request) + "\n").encode("utf-8")
+            if batch_lines and (len(batch_lines) >= OpenAISolution.BATCH_MAX_REQUESTS or batch_bytes + len(line) > OpenAISolution.BATCH_MAX_BYTES):
+                yield batch_lines
+                batch_lines = []
+                batch_bytes = 0
+
+            batch_lines.append(line)
+            batch_bytes += len(line)
+
+        if batch_lines:
+            yield batch_lines
+
+    def submit_batch(self, batch_lines):
+        file_descriptor, filepath = tempfile.mkstemp(suffix=".jsonl")
+        try:
+            with os.fdopen(file_descriptor, "wb") as file:
+                file.writelines(batch_lines)
+
+            with open(filepath, "rb") as file:
+                input_file = self.client.files.create(file=file, purpose="batch")
+        finally:
+            os.remove(filepath)
+
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=OpenAISolution.BATCH_ENDPOINT,
+            completion_window="24h")
+
+        with self.queue_lock:
+            pending = self.cache.get(key=OpenAISolution.PENDING_BATCHES_KEY, default=[])
+            self.cache.set(key=OpenAISolution.PENDING_BATCHES_KEY, value=pending + [batch.id])
+
+        self.logger.info(f"Submitted AI solution batch {batch.id} with {len(batch_lines)} prompts")
+        return batch.id
+
+    def complete_batch(self, batch_id):
+        batch = self.wait_for_batch(batch_id)
+
+        if batch.status != "completed":
+            self.logger.error(f"AI solution batch {batch_id} {batch.status}")
+
+        # Expired and cancelled batches can still have finished part of their requests
+        generated_keys = self.ingest_batch(batch)
+
+        with self.queue_lock:
+            pending = self.cache.get(key=OpenAISolution.PENDING_BATCHES_KEY, default=[])
+            self.cache.set(key=OpenAISolution.PENDING_BATCHES_KEY, value=[pending_id for pending_id in pending if pending_id != batch_id])
+
+        return generated_keys
+
+    def wait_for_batch(self, batch_id):
+        while True:
+            batch = self.client.batches.retrieve(batch_id)
+            if batch.status in OpenAISolution.BATCH_DONE_STATUSES:
+                return batch
+
+            counts = batch.request_counts
+            progress = f" {counts.completed + counts.failed}/{counts.total}" if counts else ""
+            self.logger.info(f"AI solution batch {batch_id} {batch.status}{progress}")
+            time.sleep(self.config.open_ai_batch_poll_seconds)
+
+    def ingest_batch(self, batch):
+        generated_keys = []
+
+        if batch.output_file_id:
+            output = self.client.files.content(batch.output_file_id).text
+            for line in output.splitlines():
+                if not line.strip():
+                    continue
+
+                result = json.loads(line)
+                key = result.get("custom_id")
+                response = result.get("response") or {}
+                try:
+                    if response.get("status_code") != 200:
+                        raise Exception(f"status {response.get('status_code')} {result.get('error')}")
+
+                    content = response["body"]["choices"][0]["message"]["content"]
+                    if not content:
+                        raise Exception("empty response")
+
+                    self.cache.set(key=key, value=content)
+                    generated_keys.append(key)
+                except Exception as e:
+                    self.logger.error(f"AI solution batch result not stored {key}: {e}")
+
+        if batch.error_file_id:
+            errors = self.client.files.content(batch.error_file_id).text
+            for line in errors.splitlines():
+                if line.strip():
+                    result = json.loads(line)
+                    self.logger.error(f"AI solution batch request failed {result.get('custom_id')}: {result.get('error')}")
+
+        self.logger.info(f"Stored {len(generated_keys)} AI solutions from batch {batch.id}")
+        return generated_keys
+    #endregion batch
@@ -14,8 +14,12 @@ class Prompt:
         self.config = config
         self.logger = logger
 
+    def estimate_tokens(self, text):
+        """Rough token count of a text, about 4 characters per token."""
+        return len(text or "") // 4 + 1
+
     def get_intial_prompt(self, question: Question, question_content: QuestionContent):
-        raise NotImplemented("Method not implemented")
+        raise NotImplementedError("Method not implemented")
 
     def get_prompt(self, question: Question, question_content: QuestionContent):
         prompt = self.get_intial_prompt(question, question_content)
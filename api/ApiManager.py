@@ -1,9 +1,12 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 import json
 from typing import List
 from bs4 import BeautifulSoup
 
 from logging import Logger
 
+from api.OfflineRequest import CacheMissException
 from models.Question import Question
 from models.SubmissionProgress import SubmissionProgress
 from utils.Config import Config
@@ -132,7 +135,7 @@ class ApiManager:
         key = self.reqh.key("question", "list")
 
         request = {
-            "query": "\n query problemsetQuestionList($categorySlug: String, $limit: Int, $skip: Int, $filters: QuestionListFilterInput) {\n  problemsetQuestionList: questionList(\n    categorySlug: $categorySlug\n    limit: $limit\n    skip: $skip\n    filters: $filters\n  ) {\n  questions: data {\n title\n titleSlug\n frontendQuestionId: questionFrontendId\n }\n  }\n}\n    ",
+            "query": "\n query problemsetQuestionList($categorySlug: String, $limit: Int, $skip: Int, $filters: QuestionListFilterInput) {\n  problemsetQuestionList: questionList(\n    categorySlug: $categorySlug\n    limit: $limit\n    skip: $skip\n    filters: $filters\n  ) {\n  questions: data {\n title\n titleSlug\n frontendQuestionId: questionFrontendId\n difficulty\n status\n }\n  }\n}\n    ",
             "variables": {
                 "categorySlug": "",
                 "skip": skip,
@@ -158,7 +161,7 @@ class ApiManager:
             "variables": {
                 "titleSlug": question_title_slug
             },
-            "query": "query GetQuestion($titleSlug: String!) {\n  question(titleSlug: $titleSlug) {\n title\n submitUrl\n similarQuestions\n difficulty\n  companyTagStats\n codeDefinition\n    content\n    hints\n    solution {\n      content\n   }\n   }\n }\n"
+            "query": "query GetQuestion($titleSlug: String!) {\n  question(titleSlug: $titleSlug) {\n title\n submitUrl\n similarQuestions\n difficulty\n  companyTagStats\n codeDefinition\n    content\n    hints\n    topicTags {\n      slug\n   }\n    solution {\n      content\n   }\n   }\n }\n"
         }
 
         selector = ['data', 'question']
@@ -203,38 +206,55 @@ class ApiManager:
         return data
 
     def get_slide_content(self, question_id, file_hash, filename_var1, filename_var2):
-        key = self.reqh.key("question", question_id, "slide", file_hash)
-
-        slide_url1 = f"https://assets.leetcode.com/static_assets/media/{filename_var1}.json"
-        slide_url2 = f"https://assets.leetcode.com/static_assets/media/{filename_var2}.json"
+        # Slide decks are shared by questions, so they are cached by the deck hash only
+        key = self.reqh.key("slide", file_hash)
+        # Which url variant exists: 1, 2 or 0 for neither
+        variant_key = self.reqh.key("slide", file_hash, "variant")
+
+        # Decks cached per question before they were shared
+        data = self.reqh.get(self.reqh.key("question", question_id, "slide", file_hash))
+        if data:
+            return data
+
+        slide_urls = {
+            1: f"https://assets.leetcode.com/static_assets/media/{filename_var1}.json",
+            2: f"https://assets.leetcode.com/static_assets/media/{filename_var2}.json",
+        }
         selector = ['timeline']
 
-        data = None
-        
-        try:
-            self.logger.debug(f"Slide url1: {slide_url1}")
-            data = self.reqh.request(
-                key=key,
-                method="get",
-                url=slide_url1,
-                selector=selector,
-                headers=Constants.DEFAULT_HEADERS)
-        except:
-            self.logger.error(f"Slide url1 failed: {slide_url1}")
-            self.logger.debug(f"Slide url2: {slide_url2}")
+        variant = self.reqh.get(variant_key)
+        if variant == 0:
+            self.logger.debug(f"Slide known missing: {slide_urls[1]}")
+            return None
+
+        variants = [variant] if variant in slide_urls else list(slide_urls.keys())
 
+        for variant in variants:
+            data = None
+            
             try:
+                self.logger.debug(f"Slide url{variant}: {slide_urls[variant]}")
                 data = self.reqh.request(
                     key=key,
                     method="get",
-                    url=slide_url2,
+                    url=slide_urls[variant],
                     selector=selector,
                     headers=Constants.DEFAULT_HEADERS)
-            except:
-                self.logger.error(f"Slide url2 failed: {slide_url2}")
+            except CacheMissException:
+                # Offline renders skip the page instead of writing it without its slides
+                raise
+            except Exception:
                 pass
 
-        return data
+            if data:
+                self.reqh.set(variant_key, variant)
+                return data
+            
+            self.logger.error(f"Slide url{variant} failed: {slide_urls[variant]}")
+
+        # A failed request looks the same as a missing deck, so only remember it for a day
+        self.reqh.set(variant_key, 0, expire_seconds=24 * 60 * 60)
+        return None
 
     #endregion playground codes api
     
@@ -281,26 +301,48 @@ class ApiManager:
 
     #region submissions api
     def get_submission_list(self, question_id, question_slug):
-        key = self.reqh.key("question", question_id, "submissions")
+        submissions = []
+        for page in self.get_submission_pages(question_id, question_slug):
+            submissions.extend(page)
+        
+        return submissions
 
-        request = {
-            "operationName": "submissionList",
-            "variables": {
-                "questionSlug": question_slug,
-                "offset": 0,
-                "limit": 20,
-                "lastKey": None
-            },
-            "query": "\n    query submissionList($offset: Int!, $limit: Int!, $lastKey: String, $questionSlug: String!, $lang: Int, $status: Int) {\n  questionSubmissionList(\n    offset: $offset\n    limit: $limit\n    lastKey: $lastKey\n    questionSlug: $questionSlug\n    lang: $lang\n    status: $status\n  ) {\n    lastKey\n    hasNext\n    submissions {\n      id\n      title\n      titleSlug\n      status\n      statusDisplay\n      lang\n      langName\n      runtime\n      timestamp\n      url\n      isPending\n      memory\n      hasNotes\n      notes\n      flagType\n      topicTags {\n        id\n      }\n    }\n  }\n}\n    "
-        }
-        selector = ['data', 'questionSubmissionList', 'submissions']
+    def get_submission_pages(self, question_id, question_slug, refresh=False):
+        """Yields the submissions of a question a page at a time, newest first, following the lastKey cursor."""
+        last_key = None
+        page_idx = 0
+
+        while True:
+            key = self.reqh.key("question", question_id, "submissions", "page", page_idx)
+
+            request = {
+                "operationName": "submissionList",
+                "variables": {
+                    "questionSlug": question_slug,
+                    "offset": 0,
+                    "limit": 20,
+                    "lastKey": last_key
+                },
+                "query": "\n    query submissionList($offset: Int!, $limit: Int!, $lastKey: String, $questionSlug: String!, $lang: Int, $status: Int) {\n  questionSubmissionList(\n    offset: $offset\n    limit: $limit\n    lastKey: $lastKey\n    questionSlug: $questionSlug\n    lang: $lang\n    status: $status\n  ) {\n    lastKey\n    hasNext\n    submissions {\n      id\n      title\n      titleSlug\n      status\n      statusDisplay\n      lang\n      langName\n      runtime\n      timestamp\n      url\n      isPending\n      memory\n      hasNotes\n      notes\n      flagType\n      topicTags {\n        id\n      }\n    }\n  }\n}\n    "
+            }
+            selector = ['data', 'questionSubmissionList']
 
-        data = self.reqh.request(
-            key=key,
-            request=request,
-            selector=selector)
-        
-        return data
+            data = self.reqh.request(
+                key=key,
+                request=request,
+                selector=selector,
+                refresh=refresh)
+
+            if not data:
+                return
+
+            yield data.get('submissions') or []
+
+            last_key = data.get('lastKey')
+            if not data.get('hasNext') or not last_key:
+                return
+
+            page_idx += 1
 
     def get_submission_details(self, question_id, submission_id):
         key = self.reqh.key("question", question_id, "submission", submission_id)
@@ -328,17 +370,22 @@ class ApiManager:
     #endregion submissions api
 
     #region user progress api
-    def get_user_submission_progress(self, limit=50, skip=0):
-        """Get user's submission progress (questions with submissions)."""
+    def get_user_submission_progress(self, limit=50, skip=0, refresh=False, latest_first=False):
+        """Get user's submission progress (questions with submissions), latest_first sorts by last submission."""
+        filters = {
+            "skip": skip,
+            "limit": limit
+        }
         key = self.reqh.key("user", "progress", "submissions", str(skip), str(limit))
+        if latest_first:
+            filters["sortField"] = "LAST_SUBMITTED_AT"
+            filters["sortOrder"] = "DESCENDING"
+            key = self.reqh.key(key, "latest")
 
         request = {
             "operationName": "userProgressQuestionList",
             "variables": {
-                "filters": {
-                    "skip": skip,
-                    "limit": limit
-                }
+                "filters": filters
             },
             "query": "\n    query userProgressQuestionList($filters: UserProgressQuestionListInput) {\n  userProgressQuestionList(filters: $filters) {\n    totalNum\n    questions {\n      translatedTitle\n      frontendId\n      title\n      titleSlug\n      difficulty\n      lastSubmittedAt\n      numSubmitted\n      questionStatus\n      lastResult\n      topicTags {\n        name\n        nameTranslated\n        slug\n      }\n    }\n  }\n}\n    "
         }
@@ -347,11 +394,12 @@ class ApiManager:
         data = self.reqh.request(
             key=key,
             request=request,
-            selector=selector)
+            selector=selector,
+            refresh=refresh)
         
         return data
 
-    def get_all_submissions(self) -> List[SubmissionProgress]:
+    def get_all_submissions(self, refresh=False) -> List[SubmissionProgress]:
         """Get all questions that the user has submitted solutions for.
         
         Returns a list of all questions with submission details including:
@@ -363,7 +411,7 @@ class ApiManager:
         self.logger.info("Fetching all user submissions...")
         
         # Get first batch to determine total count
-        first_batch = self.get_user_submission_progress(limit=50, skip=0)
+        first_batch = self.get_user_submission_progress(limit=50, skip=0, refresh=refresh)
         
         if not first_batch or 'totalNum' not in first_batch:
             self.logger.warning("Could not retrieve user submissions")
@@ -374,17 +422,16 @@ class ApiManager:
         
         self.logger.info(f"Total questions with submissions: {total_num}")
         
-        # Fetch remaining batches if needed
-        if total_num > 50:
-            skip = 50
-            while skip < total_num:
-                self.logger.info(f"Fetching submissions {skip} to {skip + 50}...")
-                batch = self.get_user_submission_progress(limit=50, skip=skip)
-                
+        # Every remaining offset is known now, fetch those batches in parallel
+        def get_batch(skip):
+            self.logger.info(f"Fetching submissions {skip} to {skip + 50}...")
+            return self.get_user_submission_progress(limit=50, skip=skip, refresh=refresh)
+
+        with ThreadPoolExecutor(max_workers=self.config.threads_count_for_api_calls) as executor:
+            # map keeps the batches in offset order
+            for batch in executor.map(get_batch, range(50, total_num, 50)):
                 if batch and 'questions' in batch:
                     all_questions.extend(batch['questions'])
-                
-                skip += 50
         
         self.logger.debug(f"Retrieved {len(all_questions)} questions with submissions")
         
@@ -393,6 +440,43 @@ class ApiManager:
         
         return submissions
 
+    def get_submissions_since(self, last_submitted_at: datetime) -> List[SubmissionProgress]:
+        """Get the questions submitted to after last_submitted_at, bypassing the cache.
+        
+        The progress list is requested latest submission first, so paging stops at the first question
+        submitted before the mark. If the pages come back out of order every page is read and filtered.
+        """
+        self.logger.info(f"Fetching submissions since {last_submitted_at}...")
+
+        submissions = []
+        skip = 0
+        previous_submitted_at = None
+
+        while True:
+            batch = self.get_user_submission_progress(limit=50, skip=skip, refresh=True, latest_first=True)
+            if not batch or not batch.get('questions'):
+                break
+
+            for question in batch['questions']:
+                submission = SubmissionProgress.from_json(question)
+                submitted_at = submission.get_last_submitted_at()
+
+                if submitted_at and previous_submitted_at and submitted_at > previous_submitted_at:
+                    self.logger.warning("Submission progress not sorted by last submission, reading every page")
+                    return [submission for submission in self.get_all_submissions(refresh=True)
+                        if not submission.get_last_submitted_at() or submission.get_last_submitted_at() > last_submitted_at]
+                previous_submitted_at = submitted_at or previous_submitted_at
+
+                if submitted_at and submitted_at <= last_submitted_at:
+                    return submissions
+                submissions.append(submission)
+
+            skip += 50
+            if skip >= batch.get('totalNum', 0):
+                break
+
+        return submissions
+
     #endregion user progress api
 
     #region solutions api
@@ -21,16 +21,18 @@ class CachedRequest:
         self.reqh = RetriableRequest(
             config=self.config,
             logger=self.logger,
-            session=requests.Session())
+            session=requests.Session(),
+            requests_per_second=self.config.api_requests_per_second)
     
     def key(self, *args):
         # Convert all arguments to strings and join them with '-'
         return '-'.join(map(str, args))
         
-    def request(self, key, method="post", request=None, selector=None, url=None, headers=None):
+    def request(self, key, method="post", request=None, selector=None, url=None, headers=None, refresh=False):
         """
         This function caches and performs a request if data is not already cached.
         Optionally uses a selector to filter out the required part of the response.
+        With refresh the cached data is ignored and replaced by the response.
         """
 
         headers = headers or Constants.LEETCODE_HEADERS
@@ -53,7 +55,7 @@ class CachedRequest:
             return data
 
         # Check if data exists in the cache and retrieve it
-        data = self.cache.get(key=key)
+        data = None if refresh else self.cache.get(key=key)
 
         if data is None:
             self.logger.debug(f"Cache miss {key}")
@@ -80,3 +82,18 @@ class CachedRequest:
             self.logger.debug(f"Cache hit {key}")
 
         return data
+
+    def get(self, key):
+        """Returns cached data for the key without making a request, None if not cached."""
+        if not self.config.cache_api_calls:
+            return None
+        return self.cache.get(key=key)
+
+    def set(self, key, value, expire_seconds=None):
+        """Stores data that didn't come from a request, e.g. which url variant of a resource exists."""
+        if not self.config.cache_api_calls:
+            return
+        self.cache.set(
+            key=key,
+            value=value,
+            expire=expire_seconds or self.cache_expiration_seconds)
@@ -0,0 +1,43 @@
+from logging import Logger
+
+from utils.Config import Config
+
+class CacheMissException(Exception):
+    """Custom exception to raise when offline mode needs data that isn't cached."""
+    pass
+
+class OfflineRequest:
+    """Drop-in replacement for CachedRequest that only reads the cache and never touches the network."""
+    def __init__(
+        self,
+        config: Config,
+        logger: Logger,
+        cache):
+
+        self.config = config
+        self.logger = logger
+        self.cache = cache
+
+    def key(self, *args):
+        # Convert all arguments to strings and join them with '-'
+        return '-'.join(map(str, args))
+
+    def request(self, key, method="post", request=None, selector=None, url=None, headers=None, refresh=False):
+        """
+        Returns the cached data for the key, raises CacheMissException when it isn't cached.
+        """
+        data = self.cache.get(key=key)
+
+        if data is None:
+            self.logger.warning(f"Offline cache miss {key}")
+            raise CacheMissException(f"Not in cache: {key}")
+
+        self.logger.debug(f"Cache hit {key}")
+        return data
+
+    def get(self, key):
+        return self.cache.get(key=key)
+
+    def set(self, key, value, expire_seconds=None):
+        # Nothing new is learned offline, the cache is left as it is
+        pass
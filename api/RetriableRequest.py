@@ -1,5 +1,6 @@
 import json
 import time
+from threading import Lock
 import requests
 
 from logging import Logger
@@ -8,6 +9,19 @@ from tenacity import retry, stop_after_attempt, wait_exponential, before_sleep_l
 from utils.Config import Config
 from utils.Constants import Constants
 
+try:
+    import ijson
+    from ijson.utils import sendable_list
+    # The pure python backend is slower than json.loads, streaming is only worth it with the C one
+    ijson = ijson.get_backend("yajl2_c")
+except ImportError:
+    ijson = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 class CircuitBreakerException(Exception):
     """Custom exception to raise when the circuit breaker trips."""
     pass
@@ -17,7 +31,8 @@ class RetriableRequest:
         self,
         config: Config,
         logger: Logger,
-        session):
+        session,
+        requests_per_second=0):
 
         self.config = config
         self.logger = logger
@@ -28,6 +43,11 @@ class RetriableRequest:
         self.max_failures = self.config.api_max_failures  # Number of failures before the circuit breaker trips
         self.circuit_timeout = 60  # Timeout duration for circuit breaker (in seconds)
 
+        # Minimum spacing between requests, shared by every thread using this instance
+        self.request_interval = 1 / requests_per_second if requests_per_second and requests_per_second > 0 else 0
+        self.next_request_time = 0
+        self.rate_limit_lock = Lock()
+
     def is_circuit_open(self):
         """Check if the circuit breaker is open."""
         if self.circuit_open and time.time() >= self.circuit_reset_time:
@@ -43,6 +63,19 @@ class RetriableRequest:
         self.circuit_reset_time = time.time() + self.circuit_timeout
         self.logger.error("Circuit breaker opened. No requests will be made for 60 seconds.")
 
+    def wait_for_rate_limit(self):
+        """Block until this thread's request slot comes up."""
+        if not self.request_interval:
+            return
+
+        with self.rate_limit_lock:
+            now = time.monotonic()
+            wait_time = self.next_request_time - now
+            self.next_request_time = max(now, self.next_request_time) + self.request_interval
+
+        if wait_time > 0:
+            time.sleep(wait_time)
+
     @staticmethod
     def log_before_retry(retry_state):
         """Custom logger function to access self.logger before retry."""
@@ -76,35 +109,43 @@ class RetriableRequest:
         if self.is_circuit_open():
             raise CircuitBreakerException("Circuit breaker is open, requests are blocked.")
 
+        self.wait_for_rate_limit()
+
         try:
+            stream = self.can_stream(selector)
+
             # Make the request
             response = self.session.request(
                 method=method,
                 url=url,
                 headers=headers,
-                json=request
+                json=request,
+                stream=stream
             )
 
-            # Raise an error if the response status is not 2xx
-            response.raise_for_status()
-
-            content_type = response.headers.get('Content-Type', '').lower()
-
-            if 'application/json' in content_type:
-                response_content = json.loads(response.content)
-                data = response_content
-
-                # Check if the selector is callable (a method) or a list of keys
-                if callable(selector):
-                    data = selector(response_content)
-                elif isinstance(selector, list):
-                    data = self.extract_by_selector(response_content, selector)
-            elif 'text/' in content_type:
-                # Handle text data
-                data = response.text
-            else:
-                # Handle binary data
-                data = response.content  # Raw binary data
+            with response:
+                # Raise an error if the response status is not 2xx
+                response.raise_for_status()
+
+                content_type = response.headers.get('Content-Type', '').lower()
+
+                if 'application/json' in content_type and stream:
+                    data = self.load_selected(response, selector)
+                elif 'application/json' in content_type:
+                    response_content = RetriableRequest.loads(response.content)
+                    data = response_content
+
+                    # Check if the selector is callable (a method) or a list of keys
+                    if callable(selector):
+                        data = selector(response_content)
+                    elif isinstance(selector, list):
+                        data = self.extract_by_selector(response_content, selector)
+                elif 'text/' in content_type:
+                    # Handle text data
+                    data = response.text
+                else:
+                    # Handle binary data
+                    data = response.content  # Raw binary data
 
             # If the request is successful, reset retry count
             self.retry_count = 0
@@ -131,6 +172,49 @@ class RetriableRequest:
             raise e
 
     #region basic method
+    def can_stream(self, selector):
+        """Key selectors are decoded while the response is read, callables and list indices need the whole document."""
+        return (ijson is not None
+            and self.config.api_streaming_json
+            and isinstance(selector, list)
+            and len(selector) > 0
+            and all(isinstance(key, str) for key in selector))
+
+    def load_selected(self, response, selector):
+        """Decode only the value at the selector path and the GraphQL errors, the rest of the response is parsed without being kept.
+
+        The selected value is built whole, it is cached as one entry, so only the response body and the unused parts are saved.
+        """
+        values = sendable_list()
+        errors = sendable_list()
+        parsers = [
+            ijson.items_coro(values, ".".join(selector), use_float=True),
+            ijson.items_coro(errors, "errors", use_float=True),
+        ]
+
+        # The response is read to the end so the connection goes back to the pool
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            for parser in parsers:
+                parser.send(chunk)
+        for parser in parsers:
+            parser.close()
+
+        if not values:
+            self.logger.error(f"Data is null for selector: {selector}, errors: {errors[0] if errors else None}")
+            return None
+
+        return values[0]
+
+    @staticmethod
+    def loads(content):
+        if orjson is not None:
+            try:
+                return orjson.loads(content)
+            except ValueError:
+                # orjson is stricter, e.g. on integers over 64 bits
+                pass
+        return json.loads(content)
+
     def extract_by_selector(self, response_content, selector):
         """
         Navigate through the response_content using the keys and/or indices in the selector.
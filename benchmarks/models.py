@@ -0,0 +1,103 @@
+"""Micro-benchmark of creating the Question and SubmissionProgress models.
+
+Run from the repository root:
+    python -m benchmarks.models [questions count] [companies count] [repeat]
+
+Builds the question list once and 50 to 200 favorite questions for every company, like a full company sync,
+with the models as they were before they had slots and lazy titles, then with the current ones.
+"""
+import random
+import re
+import sys
+import timeit
+import tracemalloc
+
+from models.Question import Question
+from models.SubmissionProgress import SubmissionProgress
+from utils.Constants import Constants
+
+class DictQuestion:
+    """Question before it had slots, with the title sanitized and the url built for every instance."""
+    def __init__(self, id, title_slug, title, frequency, difficulty, solved):
+        self.id = id
+        self.slug = title_slug
+        self.title = re.sub(r'[:?|></\\]', DictQuestion.replace_filename, title)
+        self.frequency = frequency
+        self.difficulty = difficulty
+        self.solved = solved
+        self.url = f"{Constants.LEETCODE_URL}/problems/{self.slug}/"
+
+    @staticmethod
+    def replace_filename(match):
+        return ' '
+
+class DictSubmissionProgress:
+    """SubmissionProgress before it had slots."""
+    def __init__(self, frontend_id, title, title_slug, difficulty, question_status, last_result, last_submitted_at, num_submitted, translated_title=None, topic_tags=None):
+        self.frontend_id = frontend_id
+        self.title = title
+        self.title_slug = title_slug
+        self.difficulty = difficulty
+        self.question_status = question_status
+        self.last_result = last_result
+        self.last_submitted_at = last_submitted_at
+        self.num_submitted = num_submitted
+        self.translated_title = translated_title
+        self.topic_tags = topic_tags or []
+
+def create_rows(questions_count, companies_count):
+    random.seed(0)
+    words = ["Two", "Sum", "Longest", "Substring", "Tree", "Path", "Median", "Arrays", "Valid", "Parentheses", "Merge", "Intervals"]
+
+    questions = []
+    for id in range(1, questions_count + 1):
+        title = " ".join(random.choices(words, k=4))
+        if id % 20 == 0:
+            title += ": Follow Up?"
+        questions.append((id, title.lower().replace(" ", "-").replace(":", "").replace("?", ""), title, 0.0, "Medium", id % 3 == 0))
+
+    rows = list(questions)
+    for _ in range(companies_count):
+        for id, slug, title, _, difficulty, solved in random.sample(questions, random.randint(50, 200)):
+            rows.append((id, slug, title, random.random() * 100, difficulty, solved))
+    return rows
+
+def create_progress_rows(questions_count):
+    return [(str(id), f"Title {id}", f"title-{id}", "MEDIUM", "SOLVED", "AC", "2024-10-07T23:57:20+00:00", 3) for id in range(1, questions_count + 1)]
+
+def measure(create, rows, repeat):
+    seconds = min(timeit.repeat(lambda: [create(*row) for row in rows], number=1, repeat=repeat))
+
+    tracemalloc.start()
+    instances = [create(*row) for row in rows]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    del instances
+    return seconds, size
+
+def compare(name, before, after, rows, repeat):
+    before_seconds, before_size = measure(before, rows, repeat)
+    after_seconds, after_size = measure(after, rows, repeat)
+
+    print(f"{name}, {len(rows)} instances")
+    print(f"  before: {before_seconds * 1000:8.1f} ms {before_size / 1024 / 1024:6.1f} MB")
+    print(f"  after:  {after_seconds * 1000:8.1f} ms {after_size / 1024 / 1024:6.1f} MB ({before_seconds / after_seconds:.1f}x faster, {before_size / after_size:.1f}x smaller)")
+
+def main():
+    questions_count = int(sys.argv[1]) if len(sys.argv) > 1 else 3500
+    companies_count = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    repeat = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    rows = create_rows(questions_count, companies_count)
+
+    # Lazy titles must match the ones sanitized up front
+    for row in rows[:questions_count]:
+        if Question(*row).title != DictQuestion(*row).title:
+            raise AssertionError(f"Title mismatch {row[2]!r}")
+
+    compare("Question", DictQuestion, Question, rows, repeat)
+    compare("SubmissionProgress", DictSubmissionProgress, SubmissionProgress, create_progress_rows(questions_count), repeat)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""Check of the OpenAI Batch API flow of OpenAISolution against a local fake of the Files and Batches endpoints.
+
+Run from the repository root:
+    python -m benchmarks.openai_batch [questions count]
+
+Generates the solutions of fake questions with a batch file size limit small enough to split them in several batches,
+then checks every solution is in the cache and no batch is left pending. A batch left pending by an interrupted run
+is resumed the same way.
+"""
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import itertools
+import json
+import logging
+import sys
+import tempfile
+import threading
+import time
+
+from diskcache import Cache
+
+from ai.OpenAISolution import OpenAISolution
+from models.Question import Question
+from utils.Config import Config
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    """Files and Batches endpoints, a batch completes on its second retrieve with one echo answer per request."""
+    files = {}
+    batches = {}
+    retrieves = {}
+    ids = itertools.count(1)
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, data, status=200):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        if self.path == "/v1/files":
+            message = BytesParser().parsebytes(f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("utf-8") + body)
+            content = next(part.get_payload(decode=True) for part in message.get_payload() if part.get_param("name", header="content-disposition") == "file")
+            with FakeOpenAIHandler.lock:
+                file_id = f"file-{next(FakeOpenAIHandler.ids)}"
+                FakeOpenAIHandler.files[file_id] = content
+            self.send_json({"id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()), "filename": "batch.jsonl", "purpose": "batch", "status": "processed"})
+
+        elif self.path == "/v1/batches":
+            request = json.loads(body)
+            with FakeOpenAIHandler.lock:
+                batch_id = f"batch-{next(FakeOpenAIHandler.ids)}"
+                FakeOpenAIHandler.batches[batch_id] = {
+                    "id": batch_id, "object": "batch", "endpoint": request["endpoint"], "input_file_id": request["input_file_id"],
+                    "completion_window": request["completion_window"], "status": "validating", "created_at": int(time.time()),
+                    "output_file_id": None, "error_file_id": None, "request_counts": {"completed": 0, "failed": 0, "total": 0}}
+            self.send_json(FakeOpenAIHandler.batches[batch_id])
+
+        else:
+            self.send_json({"error": {"message": f"Unknown path {self.path}"}}, 404)
+
+    def do_GET(self):
+        parts = self.path.strip("/").split("/")
+
+        if parts[:2] == ["v1", "batches"] and len(parts) == 3 and parts[2] in FakeOpenAIHandler.batches:
+            with FakeOpenAIHandler.lock:
+                batch = FakeOpenAIHandler.batches[parts[2]]
+                FakeOpenAIHandler.retrieves[batch["id"]] = FakeOpenAIHandler.retrieves.get(batch["id"], 0) + 1
+                if FakeOpenAIHandler.retrieves[batch["id"]] >= 2 and batch["status"] != "completed":
+                    self.complete(batch)
+            self.send_json(batch)
+
+        elif parts[:2] == ["v1", "files"] and len(parts) == 4 and parts[3] == "content" and parts[2] in FakeOpenAIHandler.files:
+            content = FakeOpenAIHandler.files[parts[2]]
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        else:
+            self.send_json({"error": {"message": f"Unknown path {self.path}"}}, 404)
+
+    def complete(self, batch):
+        lines = [json.loads(line) for line in FakeOpenAIHandler.files[batch["input_file_id"]].splitlines() if line.strip()]
+
+        output = ""
+        for line in lines:
+            content = f"Solution of {line['custom_id']}"
+            output += json.dumps({"custom_id": line["custom_id"], "response": {"status_code": 200, "body": {"choices": [{"message": {"content": content}}]}}}) + "\n"
+
+        output_file_id = f"file-{next(FakeOpenAIHandler.ids)}"
+        FakeOpenAIHandler.files[output_file_id] = output.encode("utf-8")
+        batch.update(status="completed", output_file_id=output_file_id, request_counts={"completed": len(lines), "failed": 0, "total": len(lines)})
+
+class FakePrompt:
+    def get_prompt(self, question, question_content):
+        return f"Solve {question.title} " * 50
+
+def main():
+    questions_count = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+    logger = logging.getLogger("openai_batch")
+    logger.setLevel(logging.INFO)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenAIHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    with tempfile.TemporaryDirectory() as cache_directory, Cache(cache_directory) as cache:
+        config = Config(
+            ai_solution_generator="openai",
+            open_ai_api_key="fake",
+            open_ai_base_url=f"http://127.0.0.1:{server.server_address[1]}/v1",
+            open_ai_batch_poll_seconds=0,
+            open_ai_retrieved_examples=False,
+            threads_count_for_api_calls=4)
+        solution = OpenAISolution(config=config, logger=logger, leetapi=None, cache=cache)
+        solution.prompt_gen = FakePrompt()
+
+        # About four requests per batch file
+        OpenAISolution.BATCH_MAX_BYTES = 4 * len(json.dumps({"body": solution.get_request_body(FakePrompt().get_prompt(Question(1, "q", "Question 1", 0, "", False), None))}))
+
+        questions = [Question(id, f"question-{id}", f"Question {id}", 0, "Medium", False) for id in range(1, questions_count + 1)]
+        generated = solution.generate_batch([(question, None) for question in questions])
+
+        if sorted(question.id for question in generated) != [question.id for question in questions]:
+            raise AssertionError(f"{len(generated)} of {len(questions)} solutions generated")
+        for question in questions:
+            if cache.get(key=solution.get_key(question)) != f"Solution of {solution.get_key(question)}":
+                raise AssertionError(f"Solution not cached {question.id}")
+        if len(FakeOpenAIHandler.batches) < 2:
+            raise AssertionError(f"Requests not split by file size, {len(FakeOpenAIHandler.batches)} batch")
+        if cache.get(key=OpenAISolution.PENDING_BATCHES_KEY):
+            raise AssertionError("Batches left pending")
+
+        # A batch submitted by an interrupted run is picked up by the next one
+        resumed = Question(questions_count + 1, "resumed", "Resumed", 0, "Medium", False)
+        for batch_lines in solution.split_batch_lines(solution.get_batch_requests([(resumed, None)])):
+            solution.submit_batch(batch_lines)
+        solution.generate_batch([])
+
+        if cache.get(key=solution.get_key(resumed)) is None:
+            raise AssertionError("Pending batch not resumed")
+        if cache.get(key=OpenAISolution.PENDING_BATCHES_KEY):
+            raise AssertionError("Resumed batch left pending")
+
+    server.shutdown()
+    print(f"{questions_count} solutions generated in {len(FakeOpenAIHandler.batches) - 1} batches, pending batch resumed")
+
+if __name__ == '__main__':
+    main()
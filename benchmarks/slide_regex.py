@@ -0,0 +1,90 @@
+"""Micro-benchmark of the slide marker regex over the editorials in the api cache.
+
+Run from the repository root:
+    python -m benchmarks.slide_regex [cache directory] [repeat]
+
+The cache directory defaults to the one in the saved config.
+"""
+import re
+import sys
+import timeit
+
+from diskcache import Cache
+
+from downloaders.SolutionDownloader import SolutionDownloader
+from utils.ConfigLoader import ConfigLoader
+
+# The pattern replace_slides_json used before it was precompiled
+GREEDY_PATTERN = r"!?!.*/Documents/.*!?!"
+GREEDY_FLAGS = re.IGNORECASE | re.MULTILINE
+QUESTION_KEY = re.compile(r"question-\d+")
+
+def load_editorials(cache_directory):
+    editorials = []
+
+    with Cache(directory=cache_directory) as cache:
+        for key in cache.iterkeys():
+            if not isinstance(key, str) or not QUESTION_KEY.fullmatch(key):
+                continue
+
+            data = cache.get(key)
+            solution = data.get('solution') if isinstance(data, dict) else None
+            if solution and solution.get('content'):
+                editorials.append(solution['content'])
+
+    return editorials
+
+def check_matches(editorials):
+    """Every greedy match must contain the markers; returns how many matches merged several markers or included extra text."""
+    merged = 0
+    extra_text = 0
+
+    for editorial in editorials:
+        for greedy_match in re.finditer(GREEDY_PATTERN, editorial, GREEDY_FLAGS):
+            markers = [match.group() for match in SolutionDownloader.SLIDE_PATTERN.finditer(greedy_match.group())]
+
+            if not markers:
+                raise AssertionError(f"No marker found in {greedy_match.group()!r}")
+            elif len(markers) > 1:
+                merged += 1
+            elif markers[0] != greedy_match.group():
+                extra_text += 1
+
+        # The compiled pattern must not find markers the greedy one misses
+        for match in SolutionDownloader.SLIDE_PATTERN.finditer(editorial):
+            if not re.search(GREEDY_PATTERN, match.group(), GREEDY_FLAGS):
+                raise AssertionError(f"Marker not matched by the greedy pattern {match.group()!r}")
+
+    return merged, extra_text
+
+def main():
+    cache_directory = sys.argv[1] if len(sys.argv) > 1 else ConfigLoader.load_config().cache_directory
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    editorials = load_editorials(cache_directory)
+    if not editorials:
+        print(f"No cached editorials found in {cache_directory}")
+        return
+
+    total_size = sum(len(editorial) for editorial in editorials)
+    print(f"{len(editorials)} editorials, {total_size / 1024 / 1024:.1f} MB")
+
+    merged, extra_text = check_matches(editorials)
+    print(f"Markers agree, the greedy pattern merged {merged} and included surrounding text in {extra_text} match(es)")
+
+    def run_greedy():
+        for editorial in editorials:
+            re.findall(GREEDY_PATTERN, editorial, GREEDY_FLAGS)
+
+    def run_compiled():
+        for editorial in editorials:
+            SolutionDownloader.SLIDE_PATTERN.findall(editorial)
+
+    greedy_time = min(timeit.repeat(run_greedy, number=1, repeat=repeat))
+    compiled_time = min(timeit.repeat(run_compiled, number=1, repeat=repeat))
+
+    print(f"greedy:   {greedy_time * 1000:.2f} ms")
+    print(f"compiled: {compiled_time * 1000:.2f} ms ({greedy_time / compiled_time:.1f}x)")
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,15 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import os
 
 from logging import Logger
 from typing import List
-from bs4 import BeautifulSoup
 
 from models.Card import Card
 from models.Question import Question
 
-from utils.Constants import Constants
 from utils.Util import Util
 from utils.Config import Config
+from utils.TemplateRenderer import TemplateRenderer
 
 from api.ApiManager import ApiManager
 
@@ -51,36 +51,19 @@ class CardsDownloader:
 
         card_details = self.lc.get_card_details(card_slug)
 
-        body = ""
-        for chapter in chapters:
-            body += f"""<br><h3>{chapter['title']}</h3>{chapter['description']}<br>"""
-
-            for item in chapter['items']:
-                item['title'] = Util.sanitize_title(item['title'])
-                item_fname = Util.qhtml(item['id'], item['title'])
-                
-                body += f"""<a href="{item_fname}">{item_fname}</a><br>"""
-
-        html = f"""<!DOCTYPE html><html lang="en">{Constants.HTML_HEADER}<body>
-                    <div class="mode">Dark mode:  <span class="change">OFF</span></div>"
-                    <h1 class="card-title">{card_details['title']}</h1>
-                    <p class="card-text">{card_details['introduction']}</p><br>
-                    {body}</body></html>"""
-
         filepath = os.path.join(cards_chapter_dir, "index.html")
-        with open(filepath, 'w') as file: 
-            file.write(html)
+        TemplateRenderer.render_to_file(
+            "card_index.html",
+            filepath,
+            card_details=card_details,
+            chapters=chapters)
 
     def create_cards_main_index(self, cards: List[Card]):
         os.makedirs(self.config.cards_directory, exist_ok=True)
 
         # Creating Index for Card Folder
         filepath = os.path.join(self.config.cards_directory, "index.html")
-        with open(filepath, 'w') as main_index:
-            main_index_html = ""
-            for card in cards:
-                main_index_html += f"<a href={card.slug}/index.html>{card.slug}</a><br>"
-            main_index.write(main_index_html)
+        TemplateRenderer.render_to_file("cards_index.html", filepath, cards=cards)
 
     def download_selected_card(self, card_slug):
         cards = self.get_cards()
@@ -113,17 +96,31 @@ class CardsDownloader:
     def create_chapters(self, card_slug, chapters):
         cards_chapter_dir = os.path.join(self.config.cards_directory, card_slug)
         os.makedirs(cards_chapter_dir, exist_ok=True)
-        
-        self.create_card_index(chapters, card_slug, cards_chapter_dir)
 
+        card_items = {}
         for chapter in chapters:
             chapter_items = {item['id']: Util.sanitize_title(item['title']) for item in chapter['items']}
-            chapter_items = self.filter_out_downloaded(chapter_items, cards_chapter_dir)
+            card_items.update(self.filter_out_downloaded(chapter_items, cards_chapter_dir))
 
-            for item_id, item_title in chapter_items.items():
-                item_content = self.lc.get_chapter_items(card_slug, item_id)
-                if item_content:
-                    self.create_card_html(item_content, item_title, item_id, cards_chapter_dir)
+        # Items are fetched and written in parallel, each page as soon as its content is in
+        with ThreadPoolExecutor(max_workers=self.config.threads_count_for_api_calls) as executor:
+            futures = {
+                executor.submit(self.create_chapter_item, card_slug, item_id, item_title, cards_chapter_dir): item_id
+                for item_id, item_title in card_items.items()
+            }
+
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    self.logger.error(f"Error downloading card {card_slug} item {futures[future]}: {e}")
+
+        self.create_card_index(chapters, card_slug, cards_chapter_dir)
+
+    def create_chapter_item(self, card_slug, item_id, item_title, cards_chapter_dir):
+        item_content = self.lc.get_chapter_items(card_slug, item_id)
+        if item_content:
+            self.create_card_html(item_content, item_title, item_id, cards_chapter_dir)
 
 
     def filter_out_downloaded(self, items, root_dir):
@@ -154,7 +151,10 @@ class CardsDownloader:
 
         if item_content['question']:
             question = Question.from_json(item_content['question'])
-            question_html = self.questiondownloader.get_question_html(question, cards_chapter_dir)
+            question_html = self.questiondownloader.get_question_html(
+                question,
+                cards_chapter_dir,
+                ai_solution_ready=lambda: self.create_card_html(item_content, item_title, item_id, cards_chapter_dir))
             content += question_html
 
         if item_content['article']:
@@ -163,19 +163,16 @@ class CardsDownloader:
         if item_content['htmlArticle']:
             content += self.get_html_article_html(item_content['htmlArticle']['id'], item_title, item_id)
 
-        content = f"""<body>{content}</body>"""
-
         content = self.solutiondownloader.replace_slides_json(content, item_id)
 
-        content = Constants.HTML_HEADER + content
-
-        content_soup = BeautifulSoup(content, 'html.parser')
-
+        # Parse the page once: iframes and images are fixed on the same tree
+        content_soup = Util.parse_html_body(content)
+        content_soup = self.solutiondownloader.replace_iframes_in_soup(content_soup, item_id, cards_chapter_dir)
         content_soup = self.imagedownloader.fix_image_urls(content_soup, item_id, cards_chapter_dir)
 
         card_path = os.path.join(cards_chapter_dir, Util.qhtml(item_id, item_title))
         with open(card_path, "w", encoding="utf-8") as file:
-            file.write(content_soup.prettify())
+            file.write(Util.render_html_page(content_soup))
 
     def get_article_html(self, article_id, item_title, item_id):
         self.logger.debug("Getting article data")
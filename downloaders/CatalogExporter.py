@@ -0,0 +1,213 @@
+from datetime import datetime, timezone
+import hashlib
+import json
+import os
+
+from logging import Logger
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as parquet
+except ImportError:
+    pa = None
+
+from api.ApiManager import ApiManager
+from models.Company import Company
+from utils.CompanyIndex import CompanyIndex
+from utils.Config import Config
+
+class CatalogExporter:
+    """Exports questions, companies, company favorites and submission progress as typed columnar files for analysis.
+
+    Every export adds a part file per table under catalog/<format>/<table>/, with a synced_at column, so the tables
+    can be read as datasets with the history of every sync. A table that didn't change since the last
+    export gets no new part.
+    """
+    STATE_FILENAME = "catalog_state.json"
+    EXTENSIONS = {
+        "parquet": "parquet",
+        "arrow": "arrow",
+    }
+
+    def __init__(
+        self,
+        config: Config,
+        logger: Logger,
+        leetapi: ApiManager,
+        company_index: CompanyIndex):
+
+        self.config = config
+        self.logger = logger
+        self.lc = leetapi
+        self.company_index = company_index
+        self.catalog_directory = os.path.join(self.config.save_directory, "catalog")
+
+    @staticmethod
+    def get_schemas():
+        difficulty = pa.dictionary(pa.int8(), pa.string())
+        synced_at = ("synced_at", pa.timestamp("s", tz="UTC"))
+
+        return {
+            "questions": pa.schema([
+                ("id", pa.int32()),
+                ("slug", pa.string()),
+                ("title", pa.string()),
+                ("difficulty", difficulty),
+                ("solved", pa.bool_()),
+                synced_at,
+            ]),
+            "companies": pa.schema([
+                ("slug", pa.string()),
+                ("name", pa.string()),
+                ("question_count", pa.int32()),
+                synced_at,
+            ]),
+            "company_questions": pa.schema([
+                ("company_slug", pa.dictionary(pa.int32(), pa.string())),
+                ("favorite_slug", pa.dictionary(pa.int32(), pa.string())),
+                ("favorite_name", pa.dictionary(pa.int32(), pa.string())),
+                ("question_id", pa.int32()),
+                ("frequency", pa.float64()),
+                synced_at,
+            ]),
+            "submissions": pa.schema([
+                ("question_id", pa.int32()),
+                ("slug", pa.string()),
+                ("title", pa.string()),
+                ("difficulty", difficulty),
+                ("question_status", pa.dictionary(pa.int8(), pa.string())),
+                ("last_result", pa.dictionary(pa.int8(), pa.string())),
+                ("last_submitted_at", pa.timestamp("s", tz="UTC")),
+                ("num_submitted", pa.int32()),
+                ("topic_tags", pa.list_(pa.string())),
+                synced_at,
+            ]),
+        }
+
+    def export_all(self):
+        if pa is None:
+            self.logger.error("Catalog export needs pyarrow, install it with: pip install pyarrow")
+            return
+
+        extension = CatalogExporter.EXTENSIONS.get(self.config.catalog_format)
+        if extension is None:
+            self.logger.error(f"Invalid catalog format {self.config.catalog_format}, use parquet or arrow")
+            return
+
+        schemas = CatalogExporter.get_schemas()
+        synced_at = datetime.now(timezone.utc).replace(microsecond=0)
+        state = self.load_state()
+
+        tables = {
+            "questions": self.get_question_rows,
+            "companies": self.get_company_rows,
+            "company_questions": self.get_company_question_rows,
+            "submissions": self.get_submission_rows,
+        }
+
+        for table_name, get_rows in tables.items():
+            try:
+                columns = get_rows()
+            except Exception as e:
+                self.logger.error(f"Error collecting {table_name} for the catalog: {e}")
+                continue
+
+            # Unchanged tables don't get a new part
+            rows_hash = hashlib.sha1(json.dumps(columns, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+            state_key = f"{self.config.catalog_format}/{table_name}"
+            if state.get(state_key) == rows_hash:
+                self.logger.info(f"Catalog {table_name} unchanged")
+                continue
+
+            row_count = len(next(iter(columns.values())))
+            columns["synced_at"] = [synced_at] * row_count
+            table = pa.Table.from_pydict(columns, schema=schemas[table_name])
+
+            table_directory = os.path.join(self.catalog_directory, self.config.catalog_format, table_name)
+            os.makedirs(table_directory, exist_ok=True)
+            filepath = os.path.join(table_directory, f"part-{synced_at:%Y%m%dT%H%M%SZ}.{extension}")
+            self.write_table(table, filepath)
+
+            state[state_key] = rows_hash
+            self.save_state(state)
+            self.logger.info(f"Catalog {table_name} {row_count} rows written {filepath}")
+
+    def write_table(self, table, filepath):
+        temp_filepath = f"{filepath}.tmp"
+        if self.config.catalog_format == "arrow":
+            # Uncompressed Arrow IPC files can be memory mapped by the readers
+            feather.write_feather(table, temp_filepath, compression="uncompressed")
+        else:
+            parquet.write_table(table, temp_filepath, compression="zstd")
+        os.replace(temp_filepath, filepath)
+
+    #region rows
+    def get_question_rows(self):
+        columns = {"id": [], "slug": [], "title": [], "difficulty": [], "solved": []}
+        for question in sorted(self.lc.get_all_questions(), key=lambda question: question.id):
+            columns["id"].append(question.id)
+            columns["slug"].append(question.slug)
+            columns["title"].append(question.raw_title)
+            columns["difficulty"].append(str.upper(question.difficulty) if question.difficulty else None)
+            columns["solved"].append(question.solved)
+        return columns
+
+    def get_company_rows(self):
+        companies = [Company.from_json(company) for company in self.lc.get_question_company_tags()]
+
+        columns = {"slug": [], "name": [], "question_count": []}
+        for company in sorted(companies, key=lambda company: company.slug):
+            columns["slug"].append(company.slug)
+            columns["name"].append(company.name)
+            columns["question_count"].append(int(company.question_count or 0))
+        return columns
+
+    def get_company_question_rows(self):
+        columns = {"company_slug": [], "favorite_slug": [], "favorite_name": [], "question_id": [], "frequency": []}
+
+        for company_slug in sorted(self.company_index.get_company_slugs()):
+            for favorite_slug, (favorite_name, questions) in self.company_index.get_favorite_details(company_slug).items():
+                for question in questions:
+                    columns["company_slug"].append(company_slug)
+                    columns["favorite_slug"].append(favorite_slug)
+                    columns["favorite_name"].append(favorite_name)
+                    columns["question_id"].append(question.id)
+                    columns["frequency"].append(float(question.frequency or 0))
+        return columns
+
+    def get_submission_rows(self):
+        columns = {"question_id": [], "slug": [], "title": [], "difficulty": [], "question_status": [],
+            "last_result": [], "last_submitted_at": [], "num_submitted": [], "topic_tags": []}
+
+        for progress in sorted(self.lc.get_all_submissions(), key=lambda progress: int(progress.frontend_id or 0)):
+            columns["question_id"].append(int(progress.frontend_id or 0))
+            columns["slug"].append(progress.title_slug)
+            columns["title"].append(progress.title)
+            columns["difficulty"].append(str.upper(progress.difficulty) if progress.difficulty else None)
+            columns["question_status"].append(progress.question_status or None)
+            columns["last_result"].append(progress.last_result or None)
+            columns["last_submitted_at"].append(progress.get_last_submitted_at())
+            columns["num_submitted"].append(progress.num_submitted)
+            columns["topic_tags"].append([topic_tag.get('slug') for topic_tag in progress.topic_tags])
+        return columns
+    #endregion rows
+
+    #region state
+    def load_state(self):
+        filepath = os.path.join(self.catalog_directory, CatalogExporter.STATE_FILENAME)
+        if not os.path.exists(filepath):
+            return {}
+
+        try:
+            with open(filepath, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Catalog state not readable, every table is exported {filepath}: {e}")
+            return {}
+
+    def save_state(self, state):
+        filepath = os.path.join(self.catalog_directory, CatalogExporter.STATE_FILENAME)
+        with open(filepath, "w", encoding="utf-8") as file:
+            json.dump(state, file, indent=2)
+    #endregion state
@@ -1,3 +1,4 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import os
 
 from logging import Logger
@@ -6,9 +7,10 @@ from typing import List
 from models.Company import Company
 from models.Question import Question
 
+from utils.CompanyIndex import CompanyIndex
 from utils.Util import Util
-from utils.Constants import Constants
 from utils.Config import Config
+from utils.TemplateRenderer import TemplateRenderer
 
 from api.ApiManager import ApiManager
 
@@ -20,12 +22,14 @@ class CompanyDownloader:
         config: Config,
         logger: Logger,
         leetapi: ApiManager,
-        questiondownloader: QuestionDownloader):
+        questiondownloader: QuestionDownloader,
+        company_index: CompanyIndex):
 
         self.config = config
         self.logger = logger
         self.lc = leetapi
         self.questiondownloader = questiondownloader
+        self.company_index = company_index
         
     def get_company_slugs(self) -> List[Company]:
         company_data = self.lc.get_question_company_tags()
@@ -41,10 +45,8 @@ class CompanyDownloader:
             self.logger.error(f"Company not valid {company_slug}")
             return
 
-        favorite_details = self.get_company_question_data(company_slug)
-        self.create_company_directories(company_slug, favorite_details)
-        self.create_company_indices(company_slug, favorite_details)
-        self.download_all_company_questions(company_slug, favorite_details)
+        self.download_company(company_slug)
+        self.company_index.save()
 
     def download_favorite_company_questions(self, company_slug, fav_slug):
         companies = self.get_company_slugs()
@@ -55,6 +57,9 @@ class CompanyDownloader:
             return
         
         favorite_details = self.get_company_question_data(company_slug)
+        if favorite_details:
+            self.company_index.update_company(company_slug, favorite_details)
+            self.company_index.save()
 
         if not favorite_details or fav_slug not in favorite_details.keys():
             self.logger.error(f"Company favorite slug not valid for company: {company_slug} favorite: {fav_slug}")
@@ -72,31 +77,80 @@ class CompanyDownloader:
         companies = self.get_company_slugs()
         self.create_all_company_index(companies)
 
-        for company in companies:
-            favorite_details = self.get_company_question_data(company.slug)
-            self.create_company_directories(company.slug, favorite_details)
-            self.create_company_indices(company.slug, favorite_details)
-            self.download_all_company_questions(company.slug, favorite_details)
+        # Question directories rendered during this run, later companies link to them
+        materialized = {}
+
+        # One pool for the whole sync, the api rate limit is shared by all threads.
+        # Tasks never wait on other tasks of the pool, each company moves on to its favorite lists
+        # and then to its pages as soon as its own previous step is done.
+        with ThreadPoolExecutor(max_workers=self.config.threads_count_for_api_calls) as executor:
+            futures = {executor.submit(self.get_company_favorites, company.slug): ("favorites", company.slug) for company in companies}
+            company_favorites = {}  # company slug -> (favorite slug -> display name, favorite slug -> questions)
+
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    step, key = futures.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        self.logger.error(f"Error downloading company {step} {key}: {e}")
+                        # A favorite that failed leaves the company incomplete, it is not indexed
+                        if step == "favorite list":
+                            company_favorites.pop(key[0], None)
+                        continue
+
+                    if step == "favorites":
+                        favorite_slugs, total_questions = result
+                        if not favorite_slugs:
+                            continue
+                        company_favorites[key] = (favorite_slugs, {})
+                        for favorite_slug in favorite_slugs:
+                            futures[executor.submit(self.get_favorite_questions, favorite_slug, total_questions)] = ("favorite list", (key, favorite_slug))
+
+                    elif step == "favorite list":
+                        company_slug, favorite_slug = key
+                        if company_slug not in company_favorites:
+                            continue
+                        favorite_slugs, favorite_questions = company_favorites[company_slug]
+                        favorite_questions[favorite_slug] = result
+                        if len(favorite_questions) < len(favorite_slugs):
+                            continue
+
+                        # Last list of the company, its index and pages are written right away
+                        del company_favorites[company_slug]
+                        favorite_details = {favorite_slug: (display_name, favorite_questions[favorite_slug])
+                            for favorite_slug, display_name in favorite_slugs.items()}
+                        self.company_index.update_company(company_slug, favorite_details)
+                        futures[executor.submit(self.download_company_details, company_slug, favorite_details, materialized)] = ("pages", company_slug)
+
+        self.company_index.save()
+
+    def download_company(self, company_slug, from_index=False, materialized=None):
+        favorite_details = None
+        if from_index:
+            favorite_details = self.company_index.get_favorite_details(company_slug)
+
+        if not favorite_details:
+            favorite_details = self.get_company_question_data(company_slug)
+            if not favorite_details:
+                return
+            self.company_index.update_company(company_slug, favorite_details)
+
+        self.download_company_details(company_slug, favorite_details, materialized)
+
+    def download_company_details(self, company_slug, favorite_details, materialized=None):
+        # Indices are written as soon as the company data is in
+        self.create_company_directories(company_slug, favorite_details)
+        self.create_company_indices(company_slug, favorite_details)
+        self.download_company_questions(company_slug, favorite_details, materialized)
     
     def create_all_company_index(self, companies: List[Company]):
         self.logger.debug("Creating company index.html")
-        cols = 10
-        rows = len(companies)//10 + 1
-        html = ''
-        company_idx = 0
-
-        for _ in range(rows):
-            html += '<tr>'
-            for _ in range(cols):
-                if company_idx < len(companies):
-                    company = companies[company_idx]
-                    html += f'''<td><a href="{company.slug}/index.html">{company.slug}</a></td>'''
-                    company_idx += 1
-            html += '</tr>'
 
         filepath = os.path.join(self.config.companies_directory, "index.html")
-        with open(filepath, 'w') as file:
-            file.write(f"""<!DOCTYPE html><html lang="en"><head></head><body><table>{html}</table></body></html>""")
+        TemplateRenderer.render_to_file("companies_index.html", filepath, companies=companies)
     
     def get_company_favorite_slugs(self, company_slug):
         favorite_details_data = self.lc.get_favorite_details_for_company(company_slug)
@@ -110,22 +164,35 @@ class CompanyDownloader:
         return favorite_slugs
 
 
-    def get_company_question_data(self, company_slug):
+    def get_company_favorites(self, company_slug):
+        """Favorite slug -> display name of the company and its question count, (None, 0) when not found."""
         favorite_details_data = self.lc.get_favorite_details_for_company(company_slug)
 
         if not favorite_details_data:
             self.logger.error(f"Company favorite details not found {company_slug}")
+            return None, 0
+
+        favorite_slugs = {item["favoriteSlug"]: item["displayName"] for item in favorite_details_data['generatedFavoritesInfo']['categoriesToSlugs']}
+        return favorite_slugs, favorite_details_data['questionNumber']
+
+    def get_favorite_questions(self, favorite_slug, total_questions):
+        questions_data = self.lc.get_favorite_question_list_for_company(favorite_slug, total_questions)
+        return [Question.from_json(question_data) for question_data in questions_data or []]
+
+    def get_company_question_data(self, company_slug):
+        favorite_slugs, total_questions = self.get_company_favorites(company_slug)
+
+        if not favorite_slugs:
             return
 
         favorite_details = {}
-        favorite_slugs = {item["favoriteSlug"]: item["displayName"] for item in favorite_details_data['generatedFavoritesInfo']['categoriesToSlugs']}
-        total_questions = favorite_details_data['questionNumber']
-        
-        for favorite_slug, display_name in favorite_slugs.items():
-            questions_data = self.lc.get_favorite_question_list_for_company(favorite_slug, total_questions)
-            questions = [Question.from_json(question_data) for question_data in questions_data]
 
-            favorite_details[favorite_slug] = (display_name, questions)
+        # map keeps the favorites in their original order
+        with ThreadPoolExecutor(max_workers=self.config.threads_count_for_api_calls) as executor:
+            favorite_questions = executor.map(lambda favorite_slug: self.get_favorite_questions(favorite_slug, total_questions), favorite_slugs.keys())
+
+            for (favorite_slug, display_name), questions in zip(favorite_slugs.items(), favorite_questions):
+                favorite_details[favorite_slug] = (display_name, questions)
         
         return favorite_details
     
@@ -141,59 +208,52 @@ class CompanyDownloader:
         company_root_dir = os.path.join(self.config.companies_directory, company_slug)
         root_index_file = os.path.join(company_root_dir, "index.html")
 
-        overall_html = ''
+        favorites = []
         questions_seen = set()
 
         for favorite_slug, (display_name, questions) in favorite_details.items():
             company_fav_dir  = os.path.join(self.config.companies_directory, company_slug, favorite_slug)
-            html = f"""<tr><th>Id</th><th style="width:70%">Title</th><th>Difficulty</th><th>Solved</th></tr>"""
-            
-            count = 0
-            solved_count = 0
+
+            # Each question is listed only under the first favorite it appears in
+            favorite_questions = []
             for question in questions:
                 if question.id in questions_seen:
                     continue
-
                 questions_seen.add(question.id)
-                if question.solved:
-                    solved_count += 1
-                count += 1
-
-                # frequency_label = '{:.1f}'.format(round(question.frequency, 1))
-                question_fname = Util.qhtml(question.id, question.title)
-                solved_label = 'Y' if question.solved else '-'
-                html += f'''<tr>
-                            <td><a target="_blank" href="{Constants.LEETCODE_URL}/problems/{question.slug}">{question.id}</a></td>
-                            <td><a slug="{question.slug}" title="{question.title}" href="{question_fname}">{question.title}</a></td>
-                            <td>{question.difficulty} </td>
-                            <td>{solved_label}</td>
-                            </tr>'''
+                favorite_questions.append(question)
 
             # Write each favorite slug
             fav_file = os.path.join(company_fav_dir, f"{favorite_slug}.html")
-            with open(fav_file, 'w') as file:
-                file.write(f"""<!DOCTYPE html><html lang="en"><head></head><body><h1>{company_slug} {display_name}</h1><p>Solved {solved_count} out of total {count} questions. Most frequent questions first.</p><table>{html}</table></body></html>""")
-            
-            overall_html += f"""<h1>{display_name}</h1><table>{html}</table>"""
+            TemplateRenderer.render_to_file(
+                "company_favorite.html",
+                fav_file,
+                company_slug=company_slug,
+                display_name=display_name,
+                questions=favorite_questions)
+
+            favorites.append((display_name, favorite_questions))
 
         # Write index html
-        with open(root_index_file, 'w') as file:
-            file.write(f"""<!DOCTYPE html>
-                <html lang="en">
-                <head> </head>
-                <body>{overall_html}</body>
-                </html>""")
-
-    def download_all_company_questions(self, company_slug, favorite_details):
+        TemplateRenderer.render_to_file("company_index.html", root_index_file, favorites=favorites)
+
+    def download_company_questions(self, company_slug, favorite_details, materialized=None):
         self.logger.debug("Scraping question data")
 
+        # A question is only placed under the first favorite of the company it appears in
         questions_seen = set()
+        if materialized is None:
+            materialized = {}
         
         for favorite_slug, (_, questions) in favorite_details.items():
-            self.download_all_favorite_company_questions(company_slug, favorite_slug, questions, questions_seen)
+            self.download_all_favorite_company_questions(company_slug, favorite_slug, questions, questions_seen, materialized)
 
-    def download_all_favorite_company_questions(self, company_slug, favorite_slug, questions, questions_seen=set()):
+    def download_all_favorite_company_questions(self, company_slug, favorite_slug, questions, questions_seen=None, materialized=None):
         self.logger.debug("Scraping question data")
+
+        if questions_seen is None:
+            questions_seen = set()
+        if materialized is None:
+            materialized = {}
         
         company_fav_dir  = os.path.join(self.config.companies_directory, company_slug, favorite_slug)
         
@@ -218,15 +278,31 @@ class CompanyDownloader:
                 continue
             questions_seen.add(question.id)
 
-            self.download_company_question(question, company_fav_dir)
+            self.download_company_question(question, company_fav_dir, materialized)
+
+
+    def download_company_question(self, question: Question, company_fav_dir, materialized=None):
+        if materialized is None:
+            materialized = {}
 
+        # Already rendered for another company in this run, link its files
+        source_dir = materialized.get(question.id)
+        if source_dir and source_dir != company_fav_dir:
+            linked = Util.link_question_files(
+                question_id=question.id,
+                question_title=question.title,
+                question_subfolder=source_dir,
+                dest_dir=company_fav_dir,
+                link_method=self.config.company_files_link_method)
+            if linked:
+                return
 
-    def download_company_question(self, question: Question, company_fav_dir):
         # If "always", recreate the question HTML directly
         if self.config.download_questions == "always":
             self.questiondownloader.create_question_html(
                 question=question,
                 root_dir=company_fav_dir)
+            materialized[question.id] = company_fav_dir
             return
 
         # Otherwise, try to copy from questions directory
@@ -234,7 +310,8 @@ class CompanyDownloader:
             question_id=question.id,
             question_title=question.title,
             dest_dir=company_fav_dir,
-            questions_dir=self.config.questions_directory)
+            questions_dir=self.config.questions_directory,
+            link_method=self.config.company_files_link_method)
 
         # if copy failed just download
         if not copied:
@@ -242,5 +319,6 @@ class CompanyDownloader:
             self.questiondownloader.create_question_html(
                 question=question,
                 root_dir=company_fav_dir)
+            materialized[question.id] = company_fav_dir
 
 
@@ -1,4 +1,5 @@
 import base64
+from concurrent.futures import ThreadPoolExecutor
 import hashlib
 import os
 from urllib.parse import urlparse, urlsplit
@@ -13,7 +14,7 @@ from api.RetriableRequest import CircuitBreakerException, RetriableRequest
 
 from utils.Constants import Constants
 from utils.ImageUtil import ImageUtil
-from utils.Util import Util
+from utils.Util import HTML_PARSER, Util
 from utils.Config import Config
 
 class ImageDownloader:
@@ -48,7 +49,12 @@ class ImageDownloader:
 
         # Check if we should download: "none" = never, "new" = only if not exists, "always" = always
         should_download = False
-        if self.config.download_images == "always":
+        if self.config.offline_mode:
+            # Never touch the network, use the image already on disk (recompressed webp is stored as png)
+            png_path = f"{os.path.splitext(image_path)[0]}.png"
+            if not os.path.exists(image_path) and os.path.exists(png_path):
+                image_path = png_path
+        elif self.config.download_images == "always":
             should_download = True
         elif self.config.download_images == "new" and not os.path.exists(image_path):
             should_download = True
@@ -147,6 +153,7 @@ class ImageDownloader:
         if self.config.download_images != "none":
             os.makedirs(images_dir, exist_ok=True)
 
+        image_urls = []
         for image in images:
             self.logger.debug(f"img[src]: {image['src']}")
             if image.has_attr('src') and "base64" not in image['src']:
@@ -175,35 +182,44 @@ class ImageDownloader:
 
                 if img_url:
                     image['src'] = img_url
+                    image_urls.append((image, img_url))
+
+        # Only download if download_images is not "none"
+        if self.config.download_images == "none":
+            return content_soup
+
+        # Download every distinct image of the page concurrently
+        unique_urls = list(dict.fromkeys(img_url for _, img_url in image_urls))
+        with ThreadPoolExecutor(max_workers=self.config.threads_count_for_api_calls) as executor:
+            downloaded = dict(zip(unique_urls, executor.map(lambda img_url: self.download_image(question_id, img_url, images_dir), unique_urls)))
+
+        for image, img_url in image_urls:
+            files = downloaded[img_url]
+            if files:
+                if self.config.base64_encode_image:
+                    frames = self.load_image_base64(files, img_url)
+                else:
+                    frames = self.load_image_local(files, root_dir)
 
-                # Only download if download_images is not "none"
-                if self.config.download_images != "none" and img_url:
-                    files = self.download_image(question_id, img_url, images_dir)
-                    if files:
-                        if self.config.base64_encode_image:
-                            frames = self.load_image_base64(files, img_url)
-                        else:
-                            frames = self.load_image_local(files, root_dir)
-
-                        if frames and len(frames) > 0:
-                            if len(frames) == 1:
-                                if frames[0]:
-                                    image['src'] = frames[0]
-                                else:
-                                    image.decompose()
-                            else:
-                                new_tags = []
-                                for frame in frames:
-                                    if frame:
-                                        frame_tag = content_soup.new_tag('img', src=frame)
-                                        new_tags.append(frame_tag)
-
-                                # Replace the GIF <img> tag with the new image tags
-                                image.replace_with(*new_tags)
+                if frames and len(frames) > 0:
+                    if len(frames) == 1:
+                        if frames[0]:
+                            image['src'] = frames[0]
                         else:
                             image.decompose()
                     else:
-                        image.decompose()
+                        new_tags = []
+                        for frame in frames:
+                            if frame:
+                                frame_tag = content_soup.new_tag('img', src=frame)
+                                new_tags.append(frame_tag)
+
+                        # Replace the GIF <img> tag with the new image tags
+                        image.replace_with(*new_tags)
+                else:
+                    image.decompose()
+            elif not self.config.offline_mode:
+                image.decompose()
         return content_soup
 
     def convert_all_images_to_base64(self):
@@ -212,9 +228,9 @@ class ImageDownloader:
             for file in files:
                 if file.endswith('.html'):
                     with open(os.path.join(root, file), "r") as f:
-                        soup = BeautifulSoup(f.read(), 'html.parser')
+                        soup = BeautifulSoup(f.read(), HTML_PARSER)
                         question_id, _ = Util.html_to_question(file)
-                        res_soup = self.fix_image_urls(soup, question_id)
+                        res_soup = self.fix_image_urls(soup, question_id, root)
                     with open(os.path.join(root, file), "w") as f:
-                        f.write(res_soup.prettify())
+                        f.write(str(res_soup))
         
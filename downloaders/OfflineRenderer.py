@@ -0,0 +1,96 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from logging import Logger
+
+from api.OfflineRequest import CacheMissException
+from utils.Config import Config
+
+from downloaders.CardsDownloader import CardsDownloader
+from downloaders.CompanyDownloader import CompanyDownloader
+from downloaders.QuestionDownloader import QuestionDownloader
+
+class OfflineRenderer:
+    """Rebuilds the questions, cards and companies html purely from the api cache.
+    
+    The downloaders must be created with offline_mode set, so that every api call is
+    answered by OfflineRequest and a page with missing data is skipped instead of fetched.
+    """
+    def __init__(
+        self,
+        config: Config,
+        logger: Logger,
+        questiondownloader: QuestionDownloader,
+        cardsdownloader: CardsDownloader,
+        companydownloader: CompanyDownloader):
+
+        self.config = config
+        self.logger = logger
+        self.questiondownloader = questiondownloader
+        self.cardsdownloader = cardsdownloader
+        self.companydownloader = companydownloader
+
+    def render_all(self):
+        # Existing pages are the ones being rebuilt, so nothing may be skipped as already downloaded
+        download_questions = self.config.download_questions
+        self.config.download_questions = "always"
+        try:
+            self.render_questions()
+            self.render_cards()
+            self.render_companies()
+        finally:
+            self.config.download_questions = download_questions
+
+    def render_questions(self):
+        questions = self.questiondownloader.lc.get_all_questions()
+
+        self.run_parallel(
+            "question",
+            {question.id: question for question in questions},
+            lambda question: self.questiondownloader.create_question_html(
+                question,
+                self.questiondownloader.get_question_directory(question.id)))
+
+        self.questiondownloader.create_question_index(questions)
+
+    def render_cards(self):
+        cards = self.cardsdownloader.get_cards()
+        self.cardsdownloader.create_cards_main_index(cards)
+
+        def render_card(card):
+            chapters = self.cardsdownloader.lc.get_chapters_with_items(card.slug)
+            if chapters:
+                self.cardsdownloader.create_chapters(card.slug, chapters)
+
+        self.run_parallel("card", {card.slug: card for card in cards}, render_card)
+
+    def render_companies(self):
+        companies = self.companydownloader.get_company_slugs()
+        self.companydownloader.create_all_company_index(companies)
+
+        # Favorites come from the company index when it has them, the cache otherwise
+        self.run_parallel(
+            "company",
+            {company.slug: company for company in companies},
+            lambda company: self.companydownloader.download_company(company.slug, from_index=True))
+
+        self.companydownloader.company_index.save()
+
+    def run_parallel(self, kind, items, render):
+        rendered = 0
+        skipped = 0
+
+        with ThreadPoolExecutor(max_workers=self.config.threads_count_for_rendering) as executor:
+            futures = {executor.submit(render, item): key for key, item in items.items()}
+
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                    rendered += 1
+                except CacheMissException as e:
+                    skipped += 1
+                    self.logger.warning(f"Skipped {kind} {futures[future]}, {e}")
+                except Exception as e:
+                    skipped += 1
+                    self.logger.error(f"Error rendering {kind} {futures[future]}: {e}")
+
+        self.logger.info(f"Rendered {rendered} {kind} page(s) from cache, skipped {skipped}")
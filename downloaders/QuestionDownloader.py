@@ -1,13 +1,15 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import datetime
 import os
 
 from logging import Logger
-from bs4 import BeautifulSoup
 
 from ai.AISolution import AISolution
-from utils.Constants import Constants
+from utils.CompanyIndex import CompanyIndex
+from utils.SearchIndex import SearchIndex
 from utils.Util import Util
 from utils.Config import Config
+from utils.TemplateRenderer import TemplateRenderer
 
 from api.ApiManager import ApiManager
 
@@ -27,7 +29,9 @@ class QuestionDownloader:
         solutiondownloader: SolutionDownloader,
         imagedownloader: ImageDownloader,
         submissiondownloader: SubmissionDownloader,
-        ai_solution_generator: AISolution):
+        ai_solution_generator: AISolution,
+        company_index: CompanyIndex,
+        search_index: SearchIndex):
         
         self.config = config
         self.logger = logger
@@ -36,6 +40,8 @@ class QuestionDownloader:
         self.solutiondownloader = solutiondownloader
         self.imagedownloader = imagedownloader
         self.ai_solution_generator = ai_solution_generator
+        self.company_index = company_index
+        self.search_index = search_index
     
     def get_question_folder(self, question_id: int) -> str:
         """Get the folder name for a question based on its ID (grouped by hundreds)"""
@@ -65,57 +71,33 @@ class QuestionDownloader:
             folder_path = os.path.join(self.config.questions_directory, folder_name)
             os.makedirs(folder_path, exist_ok=True)
             
-            # Generate HTML for this folder's index
-            folder_html = f"""<tr><th>Id</th><th style="width:70%">Title</th><th>Difficulty</th></tr>"""
-            for question in folder_questions:
-                filename = Util.qhtml(question.id, question.title)
-                
-                folder_html += f'''<tr>
-                            <td><a target="_blank" href="{Constants.LEETCODE_URL}/problems/{question.slug}">{question.id}</a></td>
-                            <td><a slug="{question.slug}" title="{question.title}" href="{filename}">{question.title}</a></td>
-                            <td>{question.difficulty}</td>
-                            </tr>'''
-            
             # Write subdirectory index.html
             folder_index_path = os.path.join(folder_path, "index.html")
-            folder_html_full = f"""<!DOCTYPE html><html lang="en"><head><meta charset="UTF-8"><title>Questions {folder_name}</title></head>
-                                  <body><h1>Questions {folder_name}</h1>
-                                  <p><a href="../index.html">← Back to All Questions</a></p>
-                                  <p>Total questions: {len(folder_questions)}</p>
-                                  <table border="1" cellpadding="5" cellspacing="0">{folder_html}</table>
-                                  </body></html>"""
-            with open(folder_index_path, 'w') as f:
-                f.write(folder_html_full)
+            TemplateRenderer.render_to_file(
+                "question_folder_index.html",
+                folder_index_path,
+                folder_name=folder_name,
+                questions=folder_questions)
             
             # Track info for root index
             subdirectory_info.append((folder_name, len(folder_questions)))
         
+        search_script = None
+        if self.config.build_search_index:
+            try:
+                self.search_index.export_script()
+                search_script = SearchIndex.SCRIPT_FILENAME
+            except Exception as e:
+                self.logger.error(f"Error writing the search index script: {e}")
+
         # Create root index.html with links to subdirectories
         root_index_path = os.path.join(self.config.questions_directory, "index.html")
-        
-        # Generate table with subdirectory links
-        subdirs_html = f"""<tr><th>Folder</th><th>Question Range</th><th>Count</th></tr>"""
-        total_count = 0
-        for folder_name, count in subdirectory_info:
-            total_count += count
-            # Extract range from folder name (e.g., "0100" -> "1-199")
-            folder_num = int(folder_name)
-            range_start = folder_num
-            range_end = folder_num + 99
-            subdirs_html += f'''<tr>
-                        <td><a href="{folder_name}/index.html">{folder_name}/</a></td>
-                        <td>{range_start}-{range_end}</td>
-                        <td>{count}</td>
-                        </tr>'''
-        
-        root_html = f"""<!DOCTYPE html><html lang="en"><head><meta charset="UTF-8"><title>All Questions</title></head>
-                       <body><h1>All Questions</h1>
-                       <p>Total questions: {total_count}</p>
-                       <h2>Browse by Range</h2>
-                       <table border="1" cellpadding="5" cellspacing="0">{subdirs_html}</table>
-                       </body></html>"""
-        with open(root_index_path, 'w') as f:
-            f.write(root_html)
+        TemplateRenderer.render_to_file(
+            "question_root_index.html",
+            root_index_path,
+            folders=subdirectory_info,
+            total_count=sum(count for _, count in subdirectory_info),
+            search_script=search_script)
 
     def download_selected_question(self, question_id: int):
         questions = self.lc.get_all_questions()
@@ -142,6 +124,46 @@ class QuestionDownloader:
 
         self.create_question_index(questions)
 
+    def wait_for_ai_solutions(self):
+        """Wait for the AI solutions queued while rendering, the pages are final once it returns."""
+        if self.ai_solution_generator:
+            self.ai_solution_generator.wait()
+
+    def generate_missing_ai_solutions(self):
+        """Generate the AI solutions of every question without an editorial in one batch, then update the downloaded pages."""
+        if not self.ai_solution_generator:
+            self.logger.error("No AI solution generator configured")
+            return
+
+        # Questions with a cached AI solution don't need their content
+        questions = [question for question in self.lc.get_all_questions() if not self.ai_solution_generator.get_cached_solution(question)]
+
+        items = []
+        with ThreadPoolExecutor(max_workers=self.config.threads_count_for_api_calls) as executor:
+            future_to_question = {executor.submit(self.lc.get_question, question.id, question.slug): question for question in questions}
+            for future in as_completed(future_to_question):
+                question = future_to_question[future]
+                try:
+                    question_content = QuestionContent.from_json(future.result())
+                    if not question_content.solution:
+                        items.append((question, question_content))
+                except Exception as e:
+                    self.logger.error(f"Error getting question {question.id}: {e}")
+
+        self.logger.info(f"Generating {len(items)} missing AI solutions")
+        generated = self.ai_solution_generator.generate_batch(sorted(items, key=lambda item: item[0].id))
+
+        # Pages written before the solution existed are written again
+        for question in generated:
+            question_dir = self.get_question_directory(question.id)
+            if os.path.exists(os.path.join(question_dir, Util.qhtml(question.id, question.title))):
+                try:
+                    self.create_question_html(question, question_dir)
+                except Exception as e:
+                    self.logger.error(f"Error updating question {question.id}: {e}")
+
+        self.logger.info(f"Generated {len(generated)} AI solutions")
+
     def filter_out_downloaded(self, questions):
         # If download_questions is "always", download everything (skip nothing)
         if self.config.download_questions == "always":
@@ -172,152 +194,136 @@ class QuestionDownloader:
         # Ensure the directory exists
         os.makedirs(root_dir, exist_ok=True)
 
-        question_html = self.get_question_html(question, root_dir)
-        content = f"""{Constants.HTML_HEADER}<body>{question_html}</body>"""
-        content_soup = BeautifulSoup(content, 'html.parser')
+        question_path = os.path.join(root_dir, Util.qhtml(question.id, question.title))
+        question_html = self.get_question_html(
+            question,
+            root_dir,
+            ai_solution_ready=lambda: self.create_question_html(question, root_dir),
+            search_path=question_path)
+
+        # Parse the page once: iframes and images are fixed on the same tree
+        content_soup = Util.parse_html_body(question_html)
+        content_soup = self.solutiondownloader.replace_iframes_in_soup(content_soup, question.id, root_dir)
         content_soup = self.imagedownloader.fix_image_urls(content_soup, question.id, root_dir)
 
-        question_path = os.path.join(root_dir, Util.qhtml(question.id, question.title))
         with open(question_path, 'w', encoding="utf-8") as file:
-            file.write(content_soup.prettify())
+            file.write(Util.render_html_page(content_soup))
 
     def get_similar_questions_html(self, similar_questions):
         self.logger.debug("Generating similar questions")
-        similar_questions_html = """"""
 
         if not similar_questions or similar_questions == []:
-            return similar_questions_html
-
-        similar_questions_html += f"""<div style="background: white;"><h3>Similar Questions</h3>"""
-        for idx, similar_question in enumerate(similar_questions, start=1):
-            # similar_question = question_html(similar_question['title'], similar_question['title'])
-            similar_questions_html += f"""<div class="similar-questions-container"><div>{idx}. <a target="_blank" href="https://leetcode.com/problems/{similar_question['titleSlug']}">{similar_question['title']}</a> ({similar_question['difficulty']}) <a target="_blank" href="./{similar_question['title']}.html">Local</a></div></div>"""
-        similar_questions_html += f"""</div>"""
+            return ""
 
-        return similar_questions_html
+        return TemplateRenderer.render("similar_questions.html", similar_questions=similar_questions)
 
     def get_company_tag_stats_html(self, company_tag_stats):
-        company_tag_stats_html = ""
-
         if not company_tag_stats or company_tag_stats == {}:
-            return company_tag_stats_html
+            return ""
 
-        company_tag_stats =  {int(k): v for k, v in sorted(company_tag_stats.items(), key=lambda item: int(item[0]))}
+        company_tag_stats = sorted(((int(k), v) for k, v in company_tag_stats.items()), key=lambda item: item[0])
 
-        company_tag_stats_html += f"""<div style="background: white;"><h3>Company Tag Stats</h3>"""
+        return TemplateRenderer.render("company_tag_stats.html", company_tag_stats=company_tag_stats)
 
-        for key, value in company_tag_stats.items():
-            company_tag_stats_html += f"""<h4>Years: {str(key-1)}-{str(key)}</h4><div>"""
+    def get_asked_at_html(self, question_id):
+        question_companies = self.company_index.get_question_companies(question_id)
+        if not question_companies:
+            return ""
 
-            for idx, company_tag_stat in enumerate(value):
-                if idx != 0:
-                    company_tag_stats_html += ", "
-                company_tag_stats_html += f"""{company_tag_stat['name']}"""
-                company_tag_stats_html += f""": {company_tag_stat['timesEncountered']}"""
+        # Group the favorites per company, companies with the most frequent favorite first
+        asked_at = {}
+        for company_slug, display_name, frequency in question_companies:
+            asked_at.setdefault(company_slug, []).append((display_name, frequency))
 
-            company_tag_stats_html += """</div>"""
+        return TemplateRenderer.render("asked_at.html", asked_at=list(asked_at.items()))
 
-        company_tag_stats_html += """</div>"""
-
-        return company_tag_stats_html
-
-    def get_question_html(self, question: Question, root_dir):
+    def get_question_html(self, question: Question, root_dir, ai_solution_ready=None, search_path=None):
+        """
+        ai_solution_ready: called once a queued AI solution is cached, to render the page again.
+        Without it the AI solution is generated inline.
+        search_path: page the question is written to, indexed for search when given.
+        """
         self.logger.debug("Getting question data")
         question_content_data = self.lc.get_question(question.id, question.slug)
         question_content = QuestionContent.from_json(question_content_data)
 
+        if search_path and self.config.build_search_index:
+            try:
+                self.search_index.update_question(question, question_content, search_path)
+            except Exception as e:
+                self.logger.error(f"Error indexing question {question.id} for search: {e}")
+
         company_tag_stats = self.get_company_tag_stats_html(question_content.company_tag_stats)
         similar_questions = self.get_similar_questions_html(question_content.similar_questions)
+        asked_at = self.get_asked_at_html(question.id)
 
         question_html = ""
         if question_content.content:
             question_html = Util.markdown_with_math(question_content.content)
-            question_html = f"""
-                        <div><h3>Question</h3>
-                        <md-block class="question__content">{question_html}</md-block></div>
-            """
         
-        hint_html = ""
+        hints = []
         if question_content.hints:
             for hint in question_content.hints:
                 hint = str.strip(hint)
                 hint = Util.markdown_with_math(hint)
-                hint = str.strip(hint)
-                hint_html += f"""<li>{hint}</li>"""
-            
-            hint_html += f"""<div><ul>{hint_html}</ul></div>"""
-            hint_html = f"""<div><h3>Hints</h3><md-block class="question__hints">{hint_html}</md-block></div>"""
+                hints.append(str.strip(hint))
 
-        submission_html = ""
+        submissions = []
         if self.config.include_submissions_count > 0:
-            submissions = self.submissiondownloader.get_submission_data(question_id=question.id, question_slug=question.slug, save_submission_as_file=False, limit=self.config.include_submissions_count, accepted_only=True)
-            if submissions and len(submissions) > 0:
-                for timestamp, code in submissions.items():
+            submissions_code = self.submissiondownloader.get_submission_data(question_id=question.id, question_slug=question.slug, save_submission_as_file=False, limit=self.config.include_submissions_count, accepted_only=True)
+            if submissions_code and len(submissions_code) > 0:
+                for timestamp, code in submissions_code.items():
                     submission_time = datetime.datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H.%M.%S")
-                    submission_html += f"""<div><h4>Submission Time: {submission_time}</h4>
-                    <pre class="question__default_code">{code}</pre></div>"""
-
-                submission_html = f"""
-                        <div><h3>Accepted Submissions</h3>
-                        {submission_html}</div>"""
+                    submissions.append((submission_time, code))
         
-        default_code_html = """"""
+        default_code = None
         if self.config.include_default_code:
-            default_code_html = f"""
-                            <div><h3>Default Code</h3>
-                            <pre class="question__default_code">{question_content.default_code}</pre></div>
-                """            
+            default_code = question_content.code_definition
 
-        solution_html = """"""
+        solution_title = "Solution"
+        solution_html = ""
         if question_content.solution:
             solution_html = Util.markdown_with_math(question_content.solution)
-            solution_html = self.solutiondownloader.replace_iframes_with_content(solution_html, question.id, root_dir)
             solution_html = self.solutiondownloader.replace_slides_json(solution_html, question.id)
-            solution_html = f"""
-                <div><h3>Solution</h3>
-                <md-block class="question__solution">{solution_html}</md-block></div>"""
         elif self.ai_solution_generator:
-            generated_solution = self.ai_solution_generator.get_solution(question, question_content)
+            if ai_solution_ready and self.ai_solution_generator.is_queue_enabled():
+                # Don't hold the page for the model, it is written again when the solution lands
+                generated_solution = self.ai_solution_generator.get_cached_solution(question)
+                if not generated_solution:
+                    self.ai_solution_generator.enqueue(question, question_content, ai_solution_ready)
+            else:
+                generated_solution = self.ai_solution_generator.get_solution(question, question_content)
+
             if generated_solution:
+                solution_title = f"AI Generated Solution ({self.config.ai_solution_generator})"
                 solution_html = Util.markdown_with_math(generated_solution)
-                solution_html = f"""
-                    <div><h3>AI Generated Solution ({self.config.ai_solution_generator})</h3>
-                    <md-block class="question__solution">{solution_html}</md-block></div>"""
 
-        community_solution_html = ""
+        community_solutions = []
         if not question_content.solution and self.config.include_community_solution_count > 0:
-            community_solutions = self.lc.get_all_community_solutions(question.slug)
+            community_solutions_data = self.lc.get_all_community_solutions(question.slug)
         
-            for idx, community_solution in enumerate(community_solutions, start=1):
+            for idx, community_solution in enumerate(community_solutions_data, start=1):
                 if idx > self.config.include_community_solution_count:
                     break
 
                 community_solution_content = self.lc.get_community_solution_content(int(community_solution['id']))
                 if community_solution_content:
                     community_solution_content = Util.markdown_with_math(community_solution_content)
-                    community_solution_html += f"""<div><h4>{community_solution['title']}</h4>
-                    <md-block class="question__solution">{community_solution_content}</md-block></div>"""
-
-            if community_solution_html:
-                community_solution_html = f"""
-                        <div><h3>Community Solutions</h3>
-                        {community_solution_html}</div>"""
-
-
-        question_header_html = f"""<h2 class="question__url"><a target="_blank" href="{question_content.url}">{question.id}. {question_content.title}</a></h2>"""
-        question_difficulty_html = f"""Difficulty: {question_content.difficulty}"""
-        question_full_html = f"""{question_header_html}{question_difficulty_html}{question_html}{hint_html}{default_code_html}{solution_html}{company_tag_stats}{similar_questions}{submission_html}"""
-
-        question_full_html = f""" {question_header_html}
-                        {question_html}
-                        {hint_html}
-                        {default_code_html}
-                        {solution_html}
-                        {community_solution_html}
-                        {company_tag_stats}
-                        {similar_questions}
-                        {submission_html}
-                    """
-        return question_full_html
+                    community_solutions.append((community_solution['title'], community_solution_content))
+
+        return TemplateRenderer.render(
+            "question.html",
+            question=question,
+            question_content=question_content,
+            question_html=question_html,
+            hints=hints,
+            default_code=default_code,
+            solution_title=solution_title,
+            solution_html=solution_html,
+            community_solutions=community_solutions,
+            company_tag_stats_html=company_tag_stats,
+            asked_at_html=asked_at,
+            similar_questions_html=similar_questions,
+            submissions=submissions)
 
     #endregion html generation
\ No newline at end of file
@@ -1,3 +1,4 @@
+from concurrent.futures import ThreadPoolExecutor
 import hashlib
 import os
 import re
@@ -8,10 +9,15 @@ from logging import Logger
 from downloaders.VideoDownloader import VideoDownloader
 from utils.Util import Util
 from utils.Config import Config
+from utils.TemplateRenderer import TemplateRenderer
 
 from api.ApiManager import ApiManager
 
 class SolutionDownloader:
+    # Slide marker in editorials, e.g. !?!../Documents/300_LIS.json:1280,720!?!
+    # Markers never contain "!" or a line break, so the scan is linear and two markers on a line stay separate
+    SLIDE_PATTERN = re.compile(r"!\?!([^!\n]*?/Documents/[^!\n]*?)!\?!", re.IGNORECASE)
+
     def __init__(
         self,
         config: Config,
@@ -71,7 +77,9 @@ class SolutionDownloader:
             
             # Check if we should download: "always" = always, "new" = only if not exists
             should_download = False
-            if self.config.download_videos == "always":
+            if self.config.offline_mode:
+                should_download = False
+            elif self.config.download_videos == "always":
                 should_download = True
             elif self.config.download_videos == "new" and not os.path.exists(video_path):
                 should_download = True
@@ -90,10 +98,9 @@ class SolutionDownloader:
         iframe.replace_with(BeautifulSoup(video_html, 'html.parser'))
 
 
-    def replace_iframes_with_content(self, content, question_id, root_dir):
+    def replace_iframes_in_soup(self, content_soup, question_id, root_dir):
         self.logger.debug("Replacing iframe with code")
 
-        content_soup = BeautifulSoup(content, 'html.parser')
         iframes = content_soup.find_all('iframe')
 
         for iframe in iframes:
@@ -105,10 +112,10 @@ class SolutionDownloader:
             elif "vimeo" in src_url_lcase:
                 self.get_video_content(iframe, question_id, src_url, root_dir)
 
-        return str(content_soup)
+        return content_soup
 
  
-    def slide_match(self, slide_name, question_id, slide_idx):
+    def get_slide_deck(self, slide_name, question_id):
         json_split = slide_name.strip().split(".json")
         base_name = json_split[-2]
         
@@ -130,42 +137,26 @@ class SolutionDownloader:
             self.logger.error(f"Slide content not found {question_id}\n{filename_var1}\n{filename_var2}")
             slide_content = []
 
-        slides_html = f"""<div id="carouselExampleControls-{slide_idx}" class="carousel slide" data-bs-ride="carousel">
-                        <div  class="carousel-inner">"""
-        for img_idx, img_links in enumerate(slide_content):
-            slides_html += f"""<div class="carousel-item {'active' if img_idx == 0 else ''}">
-                                <img src="{img_links['image']}" class="d-block" alt="...">
-                            </div>"""
-        
-        slides_html += f"""</div>
-                            <button class="carousel-control-prev" type="button" data-bs-target="#carouselExampleControls-{slide_idx}" data-bs-slide="prev">
-                                <span class="carousel-control-prev-icon" aria-hidden="true"></span>
-                                <span class="visually-hidden"></span>
-                            </button>
-                            <button class="carousel-control-next" type="button" data-bs-target="#carouselExampleControls-{slide_idx}" data-bs-slide="next">
-                                <span class="carousel-control-next-icon" aria-hidden="true"></span>
-                                <span class="visually-hidden"></span>
-                            </button>
-                            </div>"""
-        return slides_html
+        return slide_content
 
     def replace_slides_json(self, content, question_id):
         self.logger.debug("Replacing slides json")
 
+        # Resolve every distinct deck of the page concurrently before substituting
+        slide_names = list(dict.fromkeys(match.group() for match in SolutionDownloader.SLIDE_PATTERN.finditer(content)))
+        if not slide_names:
+            return content
+
+        with ThreadPoolExecutor(max_workers=self.config.threads_count_for_api_calls) as executor:
+            slide_decks = dict(zip(slide_names, executor.map(lambda slide_name: self.get_slide_deck(slide_name, question_id), slide_names)))
+
         slide_idx = [0]  # A list to hold the counter, because lists are mutable
 
         def slide_replacement(match):
             current_slide_idx = slide_idx[0]  # Get the current slide index
             slide_idx[0] += 1  # Increment the counter
             
-            # Call slide_match with the current index
-            return self.slide_match(match.group(), question_id, current_slide_idx)
-
+            return TemplateRenderer.render("slides.html", slide_idx=current_slide_idx, slide_content=slide_decks[match.group()])
 
-        word = "/Documents/"
-        content = re.sub(
-            pattern=fr"!?!.*{word}.*!?!",
-            string=content,
-            flags=re.IGNORECASE | re.MULTILINE,
-            repl=slide_replacement)
-        return content
\ No newline at end of file
+        content = SolutionDownloader.SLIDE_PATTERN.sub(slide_replacement, content)
+        return content
@@ -1,3 +1,6 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+import json
 import os
 
 from logging import Logger
@@ -11,6 +14,9 @@ from api.ApiManager import ApiManager
 from models.Submission import Submission
 
 class SubmissionDownloader:
+    # Latest submission time of the last full or incremental sync
+    SYNC_STATE_FILENAME = "sync_state.json"
+
     def __init__(
         self,
         config: Config,
@@ -33,52 +39,158 @@ class SubmissionDownloader:
 
 
     def get_all_submissions(self):
-        submissions = self.lc.get_all_submissions()
-
-        for submission in submissions:
-            self.get_submission_data(question_id=submission.id, question_slug=submission.slug, save_submission_as_file=True, accepted_only=False, limit=None)
+        sync_state = self.load_sync_state()
 
-    def get_submission_data(self, question_id, question_slug, save_submission_as_file, limit = None, accepted_only = True):
+        last_submitted_at = None
+        if self.config.incremental_submission_sync and sync_state.get('last_submitted_at'):
+            last_submitted_at = datetime.fromisoformat(sync_state['last_submitted_at'])
 
-        submissions_code = {}
+        # Only questions submitted to since the last sync, with fresh submission lists
+        if last_submitted_at:
+            submissions = self.lc.get_submissions_since(last_submitted_at)
+            since_timestamp = int(last_submitted_at.timestamp())
+            self.logger.info(f"{len(submissions)} question(s) with new submissions since {last_submitted_at}")
+        else:
+            submissions = self.lc.get_all_submissions()
+            since_timestamp = None
+
+        failed = False
+
+        # Questions are downloaded in parallel, the api rate limit is shared by all threads
+        with ThreadPoolExecutor(max_workers=self.config.threads_count_for_api_calls) as executor:
+            futures = {
+                executor.submit(
+                    self.get_submission_data,
+                    question_id=submission.frontend_id,
+                    question_slug=submission.title_slug,
+                    save_submission_as_file=True,
+                    accepted_only=False,
+                    limit=None,
+                    since_timestamp=since_timestamp,
+                    refresh=last_submitted_at is not None,
+                    raise_on_missing=True): submission.frontend_id
+                for submission in submissions
+            }
+
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    failed = True
+                    self.logger.error(f"Error downloading submissions {futures[future]}: {e}")
+
+        # Keep the old mark if anything failed, so the next sync picks it up again
+        submitted_at = [submission.get_last_submitted_at() for submission in submissions if submission.last_submitted_at]
+        if submitted_at and not failed:
+            sync_state['last_submitted_at'] = max(submitted_at + ([last_submitted_at] if last_submitted_at else [])).isoformat()
+            self.save_sync_state(sync_state)
+
+    def load_sync_state(self):
+        sync_state_path = os.path.join(self.config.submissions_directory, SubmissionDownloader.SYNC_STATE_FILENAME)
+        if not os.path.exists(sync_state_path):
+            return {}
+
+        try:
+            with open(sync_state_path, 'r') as file:
+                return json.load(file)
+        except (json.JSONDecodeError, OSError) as e:
+            self.logger.warning(f"Ignoring unreadable submission sync state {sync_state_path}: {e}")
+            return {}
+
+    def save_sync_state(self, sync_state):
+        os.makedirs(self.config.submissions_directory, exist_ok=True)
+        sync_state_path = os.path.join(self.config.submissions_directory, SubmissionDownloader.SYNC_STATE_FILENAME)
+        with open(sync_state_path, 'w') as file:
+            json.dump(sync_state, file, indent=4)
+
+    def get_submission_data(self, question_id, question_slug, save_submission_as_file, limit = None, accepted_only = True, since_timestamp = None, refresh = False, raise_on_missing = False):
 
         question_id = int(question_id)
 
-        submissions_data = self.lc.get_submission_list(question_id, question_slug)
-        if not submissions_data or len(submissions_data) == 0:
+        # Pages come newest first, stop as soon as there are enough submissions or older ones than since_timestamp
+        submissions = []
+        for submissions_data in self.lc.get_submission_pages(question_id, question_slug, refresh=refresh):
+            page = [Submission.from_json(submission) for submission in submissions_data if not accepted_only or submission['statusDisplay'] == "Accepted"]
+
+            if since_timestamp is not None:
+                newer = [submission for submission in page if submission.timestamp > since_timestamp]
+                submissions.extend(newer)
+                if len(newer) < len(page):
+                    break
+            else:
+                submissions.extend(page)
+
+            if limit and len(submissions) >= limit:
+                break
+
+        if len(submissions) == 0:
             self.logger.debug(f"Submission wasn't downloaded {question_id}")
             return
         
-        if accepted_only:
-            submissions = [Submission.from_json(submission) for submission in submissions_data if submission['statusDisplay'] == "Accepted"]
-        else:
-            submissions = [Submission.from_json(submission) for submission in submissions_data]
-        
         limit = limit or len(submissions)        
         
         # Sorted by timestamp in descending order, take n
         submissions = sorted(submissions, key=lambda item: item.timestamp, reverse=True)[:limit]
 
-        submissions_code = {}
+        # Saved submissions are skipped and file numbers grow with time, new files are numbered after the saved ones
+        file_numbers = {}
+        if save_submission_as_file:
+            saved_submissions = self.get_saved_submissions(question_id)
+            submissions = [submission for submission in submissions if str(submission.id) not in saved_submissions]
+            number_offset = max(saved_submissions.values(), default=0)
+            for i, submission in enumerate(reversed(submissions)):
+                file_numbers[submission.id] = number_offset + i + 1
 
-        for i, submission in enumerate(submissions):
+        def get_submission_code(submission):
             submission_detail_content = self.lc.get_submission_details(question_id, submission.id)
             if not submission_detail_content:
                 self.logger.error(f"Submission detail wasn't downloaded {question_id} submission {submission.id}")
-                continue
-            
-            submissions_code[submission.timestamp] = submission_detail_content['code']
+                return None
             
             if save_submission_as_file:
-                submissions_dir = os.path.join(self.config.submissions_directory, Util.qstr(question_id))
-                os.makedirs(submissions_dir, exist_ok=True)
+                self.save_submission_file(question_id, file_numbers[submission.id], submission, submission_detail_content['code'])
+
+            return submission_detail_content['code']
+
+        # Details are fetched in parallel and each file is written as soon as its code is in
+        with ThreadPoolExecutor(max_workers=self.config.threads_count_for_api_calls) as executor:
+            submissions_codes = list(executor.map(get_submission_code, submissions))
 
-                file_extension = Constants.FILE_EXTENSIONS[submission.lang]
-                submission_file_name = f"{i+1:02}-{submission.id}.{file_extension}"
-                submission_file_path = os.path.join(submissions_dir, submission_file_name)
+        missing_count = submissions_codes.count(None)
+        if missing_count and raise_on_missing:
+            raise Exception(f"{missing_count} submission detail(s) not downloaded {question_id}")
 
-                if not os.path.exists(submission_file_path):
-                    with open(submission_file_path, "w") as outfile:
-                        outfile.write(submission_detail_content['code'])                
+        submissions_code = {}
+        for submission, code in zip(submissions, submissions_codes):
+            if code is not None:
+                submissions_code[submission.timestamp] = code
             
         return submissions_code
+
+    def get_saved_submissions(self, question_id):
+        """Submission id -> file number of the submissions saved for the question, from the <number>-<id>.<extension> file names."""
+        submissions_dir = os.path.join(self.config.submissions_directory, Util.qstr(question_id))
+        if not os.path.isdir(submissions_dir):
+            return {}
+
+        saved_submissions = {}
+        for filename in os.listdir(submissions_dir):
+            number, _, submission_id = os.path.splitext(filename)[0].partition("-")
+            if number.isdigit() and submission_id:
+                saved_submissions[submission_id] = int(number)
+        return saved_submissions
+
+    def save_submission_file(self, question_id, number, submission, code):
+        # A submission saved under another number is not written again
+        if str(submission.id) in self.get_saved_submissions(question_id):
+            return
+
+        submissions_dir = os.path.join(self.config.submissions_directory, Util.qstr(question_id))
+        os.makedirs(submissions_dir, exist_ok=True)
+
+        file_extension = Constants.FILE_EXTENSIONS[submission.lang]
+        submission_file_name = f"{number:02}-{submission.id}.{file_extension}"
+        submission_file_path = os.path.join(submissions_dir, submission_file_name)
+
+        with open(submission_file_path, "w") as outfile:
+            outfile.write(code)
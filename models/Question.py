@@ -2,14 +2,31 @@ from utils.Constants import Constants
 from utils.Util import Util
 
 class Question:
+    # Thousands are created for the question list and every company favorite list
+    __slots__ = ('id', 'slug', 'raw_title', 'frequency', 'difficulty', 'solved', '_title', '_url')
+
     def __init__(self, id: int, title_slug: str, title: str, frequency: float, difficulty: str, solved: bool):
         self.id = id
         self.slug = title_slug
-        self.title = Util.sanitize_title(title)
+        self.raw_title = title
         self.frequency = frequency
         self.difficulty = difficulty
         self.solved = solved
-        self.url = f"{Constants.LEETCODE_URL}/problems/{self.slug}/"
+        self._title = None
+        self._url = None
+
+    @property
+    def title(self):
+        """Title usable in file names, sanitized on first use."""
+        if self._title is None:
+            self._title = Util.sanitize_title(self.raw_title)
+        return self._title
+
+    @property
+    def url(self):
+        if self._url is None:
+            self._url = f"{Constants.LEETCODE_URL}/problems/{self.slug}/"
+        return self._url
 
     @staticmethod
     def from_json(data: dict) -> 'Question':
@@ -20,12 +37,13 @@ class Question:
         slug = data.get('titleSlug', '')
         title = data.get('title', '')
         frequency = data.get('frequency', None)
-        solved = data.get('status', '')
+        # Favorite lists have SOLVED, the question list has ac, both have null when never submitted
+        solved = data.get('status') or ''
         
         id = int(id) if id not in [None, ''] else 0
         frequency = float(frequency) if frequency not in [None, ''] else 0.0
         difficulty = data.get('difficulty', '')
-        solved = True if str.upper(solved) == 'SOLVED' else False
+        solved = True if str.upper(solved) in ('SOLVED', 'AC') else False
 
         return Question(id, slug, title, frequency, difficulty, solved)
 
@@ -6,7 +6,7 @@ from utils.Constants import Constants
 from utils.Util import Util
 
 class QuestionContent:
-    def __init__(self, title: str, content: str, difficulty: str, company_tag_stats: str, similar_questions: str, submit_url: str, default_code: str, solution: Optional[str], hints: List[str]):
+    def __init__(self, title: str, content: str, difficulty: str, company_tag_stats: str, similar_questions: str, submit_url: str, default_code: str, solution: Optional[str], hints: List[str], topic_tags: List[str] = None):
         self.title = title
         self.content = content
         self.difficulty = difficulty
@@ -16,6 +16,7 @@ class QuestionContent:
         self.code_definition = default_code
         self.solution = solution
         self.hints = hints
+        self.topic_tags = topic_tags or []
         self.url = Constants.LEETCODE_URL + self.submit_url[:-7]
 
     @staticmethod
@@ -34,6 +35,7 @@ class QuestionContent:
             solution = re.sub(r'\[TOC\]', '', data['solution']['content'])
         
         hints = data.get('hints', [])
+        topic_tags = [topic_tag['slug'] for topic_tag in data.get('topicTags') or []]
 
         if company_tag_stats:
             company_tag_stats = json.loads(company_tag_stats)
@@ -49,7 +51,8 @@ class QuestionContent:
             submit_url=submit_url,
             default_code=default_code,
             solution=solution,
-            hints=hints
+            hints=hints,
+            topic_tags=topic_tags
         )
 
     def __repr__(self):
@@ -1,5 +1,9 @@
+from datetime import datetime
+
 class SubmissionProgress:
     """Model for user's submission progress on a question."""
+    __slots__ = ('frontend_id', 'title', 'title_slug', 'difficulty', 'question_status', 'last_result',
+        'last_submitted_at', 'num_submitted', 'translated_title', 'topic_tags')
     
     def __init__(
         self,
@@ -67,6 +71,12 @@ class SubmissionProgress:
             topic_tags=topic_tags
         )
     
+    def get_last_submitted_at(self) -> datetime:
+        """The last submission time as an aware datetime, None if not set."""
+        if not self.last_submitted_at:
+            return None
+        return datetime.fromisoformat(self.last_submitted_at)
+
     def __repr__(self):
         return f"SubmissionProgress(id={self.frontend_id}, title={self.title}, status={self.question_status}, result={self.last_result})"
 
@@ -0,0 +1,131 @@
+import gzip
+import json
+import os
+
+from logging import Logger
+from threading import Lock
+
+from models.Question import Question
+from utils.Config import Config
+
+class CompanyIndex:
+    """Which companies ask which question, collected while syncing companies.
+
+    Saved as gzipped json in the companies directory:
+        questions: question id -> [slug, title, difficulty, solved]
+        companies: company slug -> [[favorite slug, display name, [[question id, frequency], ...]], ...]
+
+    The inverted view, question id -> [(company slug, favorite name, frequency)], is built on the first read after a change.
+    """
+    FILENAME = "company_index.json.gz"
+
+    def __init__(
+        self,
+        config: Config,
+        logger: Logger):
+
+        self.config = config
+        self.logger = logger
+        self.filepath = os.path.join(self.config.companies_directory, CompanyIndex.FILENAME)
+        self.lock = Lock()
+        self.questions = None
+        self.companies = None
+        self.question_companies = None
+
+    #region persistence
+    def load(self):
+        with self.lock:
+            self.load_locked()
+
+    def load_locked(self):
+        if self.companies is not None:
+            return
+
+        self.questions = {}
+        self.companies = {}
+
+        if os.path.exists(self.filepath):
+            try:
+                with gzip.open(self.filepath, "rt", encoding="utf-8") as file:
+                    data = json.load(file)
+                self.questions = {int(question_id): question for question_id, question in data.get("questions", {}).items()}
+                self.companies = data.get("companies", {})
+            except (OSError, ValueError) as e:
+                self.logger.warning(f"Company index not readable, starting a new one {self.filepath}: {e}")
+
+    def save(self):
+        with self.lock:
+            if self.companies is None:
+                return
+
+            data = {
+                "questions": self.questions,
+                "companies": self.companies,
+            }
+
+            os.makedirs(self.config.companies_directory, exist_ok=True)
+            temp_filepath = f"{self.filepath}.tmp"
+            with gzip.open(temp_filepath, "wt", encoding="utf-8") as file:
+                json.dump(data, file, separators=(",", ":"))
+            os.replace(temp_filepath, self.filepath)
+
+        self.logger.debug(f"Company index saved {self.filepath}")
+    #endregion persistence
+
+    def build_question_companies(self):
+        question_companies = {}
+
+        for company_slug, favorites in self.companies.items():
+            for _, display_name, questions in favorites:
+                for question_id, frequency in questions:
+                    question_companies.setdefault(question_id, []).append((company_slug, display_name, frequency))
+
+        self.question_companies = question_companies
+
+    def update_company(self, company_slug, favorite_details):
+        """Store the favorites of a company as returned by CompanyDownloader.get_company_question_data."""
+        with self.lock:
+            self.load_locked()
+
+            favorites = []
+            for favorite_slug, (display_name, questions) in favorite_details.items():
+                for question in questions:
+                    self.questions[question.id] = [question.slug, question.title, question.difficulty, question.solved]
+                favorites.append([favorite_slug, display_name, [[question.id, question.frequency] for question in questions]])
+
+            self.companies[company_slug] = favorites
+            # Rebuilt on the next read, a full sync updates every company first
+            self.question_companies = None
+
+    def get_company_slugs(self):
+        with self.lock:
+            self.load_locked()
+            return list(self.companies.keys())
+
+    def get_favorite_details(self, company_slug):
+        """Favorite details of a company in the shape of CompanyDownloader.get_company_question_data, None if not indexed."""
+        with self.lock:
+            self.load_locked()
+            favorites = self.companies.get(company_slug)
+
+            if favorites is None:
+                return None
+
+            favorite_details = {}
+            for favorite_slug, display_name, questions in favorites:
+                favorite_details[favorite_slug] = (display_name, [self.get_question(question_id, frequency) for question_id, frequency in questions])
+            return favorite_details
+
+    def get_question(self, question_id, frequency):
+        slug, title, difficulty, solved = self.questions[question_id]
+        return Question(question_id, slug, title, frequency, difficulty, solved)
+
+    def get_question_companies(self, question_id):
+        """List of (company slug, favorite name, frequency) that ask the question, most frequent first."""
+        with self.lock:
+            self.load_locked()
+            if self.question_companies is None:
+                self.build_question_companies()
+            companies = self.question_companies.get(question_id, [])
+
+        return sorted(companies, key=lambda company: company[2], reverse=True)
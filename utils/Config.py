@@ -14,29 +14,49 @@ class Config:
         self.submissions_directory: str = ""
         self.cache_api_calls: bool = True
         self.cache_expiration_days: int = 7
+        self.offline_mode: bool = False  # Only read the api cache, never use the network
         self.download_questions: str = "new"  # Options: "none", "always", "new"
         self.preferred_language_order: list = ["all"]
         self.include_submissions_count: int = 0
+        self.incremental_submission_sync: bool = True  # Only fetch submissions made since the last sync
         self.include_community_solution_count: int = 1
         self.include_default_code: bool = False
+        self.build_search_index: bool = True
+        self.catalog_format: str = "parquet"  # Options: "parquet", "arrow"
         self.extract_gif_frames: bool = False
         self.recompress_image_formats: list = ["webp"]  # Options: "png", "jpg", "webp"
         self.base64_encode_image: bool = False
         self.download_images: str = "new"  # Options: "none", "always", "new"
         self.download_videos: str = "new"  # Options: "none", "always", "new"
         self.threads_count_for_pdf_conversion: int = 8
+        self.pdf_failure_action: str = "degraded"  # Options: "retry", "skip", "degraded"
+        self.threads_count_for_rendering: int = 8
+        self.company_files_link_method: str = "hardlink"  # Options: "copy", "hardlink", "reflink", "symlink"
         self.api_max_failures = 3
+        self.threads_count_for_api_calls: int = 4
+        self.api_requests_per_second: int = 5  # 0 for no limit
+        self.api_streaming_json: bool = True  # Needs ijson
 
         self.logging_level = "warning" # Options: "debug", "info", "warning", "error"
 
         # None, ollama or openai
         self.ai_solution_generator = None # Options: "none", "ollama", "openai"
+        self.threads_count_for_ai_solutions: int = 2  # 0 generates inline while the page is rendered
+        self.ai_solution_streaming: bool = True
+        self.ai_solution_log_stream: bool = False  # Log the solution text as it is generated
+        self.ai_solution_timeout_minutes: int = 10
 
         self.open_ai_api_key = ""
         self.open_ai_model = "gpt-5-mini"
+        self.open_ai_base_url = ""  # Empty for the OpenAI API, or the /v1 url of a compatible server
+        self.open_ai_batch_poll_seconds: int = 60
+        self.open_ai_retrieved_examples: bool = True  # Pick prompt examples among the cached questions with editorial
+        self.open_ai_prompt_max_tokens: int = 12000  # Estimated at 4 characters per token, 0 for no limit
 
         self.ollama_url = "http://localhost:11434/api/generate"
         self.ollama_model = "llama3.1"
+        self.ollama_keep_alive = "30m"  # How long the model stays loaded after a request, e.g. "5m", "1h", "-1" to keep it loaded
+        self.ollama_parallel_requests: int = 1  # Match OLLAMA_NUM_PARALLEL of the server
 
         # Dynamically update the attributes from kwargs
         for key, value in kwargs.items():
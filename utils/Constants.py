@@ -80,6 +80,7 @@ class Constants:
     HTML_HEADER = None
 
     ASSETS_DIR = None
+    TEMPLATES_DIR = None
 
     TEX_TEMPLATE_PATH = None
     TEX_HEADER_PATH = None
@@ -91,6 +92,10 @@ class Constants:
     def get_assets_dir():
         return os.path.join(Constants.ROOT_DIR, "assets")
 
+    @staticmethod
+    def get_templates_dir():
+        return os.path.join(Constants.ASSETS_DIR, "templates")
+
     @staticmethod
     def get_tex_template_path():
         filepath = os.path.join(Constants.ASSETS_DIR, "template.latex")
@@ -161,6 +166,7 @@ class Constants:
     #endregion headers
 
 Constants.ASSETS_DIR = Constants.get_assets_dir()
+Constants.TEMPLATES_DIR = Constants.get_templates_dir()
 Constants.HTML_HEADER = Constants.get_html_header()
 Constants.TEX_TEMPLATE_PATH = Constants.get_tex_template_path()
 Constants.TEX_HEADER_PATH = Constants.get_tex_header_path()
@@ -48,19 +48,23 @@ class ImageUtil:
                 img.save(img_path, 'PNG', compress_level=0)
 
     @staticmethod
-    def recompress_images(question_id, images_dir, formats=None):
+    def recompress_images(question_id, images_dir, formats=None, filenames=None):
         """Recompress all images for a given question.
         
         Args:
             question_id: The question ID
             images_dir: Directory containing the images
             formats: List of formats to recompress. If None, uses ["all"]
+            filenames: Optional pre-scanned filenames of the question, avoids listing images_dir
         """
         # Convert the question_id to a zero-padded 4-digit string
         question_id_str = Util.qstr(question_id)
 
+        if filenames is None:
+            filenames = os.listdir(images_dir)
+
         # Loop through all files in the source folder
-        for filename in os.listdir(images_dir):
+        for filename in filenames:
             if filename.startswith(question_id_str):
                 input_image_path = os.path.join(images_dir, filename)
                 ImageUtil.recompress_image(input_image_path, formats)
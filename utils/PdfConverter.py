@@ -1,7 +1,10 @@
+import json
 import os
+import re
+import tempfile
 import pypandoc
 from queue import Queue
-from threading import Thread
+from threading import Lock, Thread
 
 from logging import Logger
 
@@ -11,6 +14,23 @@ from utils.ImageUtil import ImageUtil
 from utils.Util import Util
 
 class PdfConverter:
+    FAILURE_CACHE_FILENAME = "failures.json"
+
+    # Image references that show up in pandoc/xelatex error output
+    IMAGE_ERROR_PATTERN = re.compile(r"([\w./\\-]+\.(?:png|jpe?g|gif|webp|svg|bmp|tiff?))", re.IGNORECASE)
+
+    # LaTeX errors caused by the page content itself (usually math), an image fix won't help
+    CONSTRUCT_ERROR_MARKERS = [
+        "Undefined control sequence",
+        "Missing $ inserted",
+        "Extra }, or forgotten",
+        "Missing } inserted",
+        "Double superscript",
+        "Double subscript",
+        "Dimension too large",
+        "TeX capacity exceeded"
+    ]
+
     def __init__(
         self, 
         config: Config,
@@ -25,6 +45,11 @@ class PdfConverter:
         self.images_dir = images_dir
         self.overwrite_pdf = overwrite_pdf
         self.keep_docx = keep_docx
+
+        self.last_errors = {}
+        self.failure_cache = {}
+        self.failure_cache_path = None
+        self.failure_cache_lock = Lock()
         
         self.docxArgs = [
             '--resource-path', images_dir
@@ -58,6 +83,7 @@ class PdfConverter:
 
         pdf_output_folder = os.path.join(source_folder, 'pdf')
         os.makedirs(pdf_output_folder, exist_ok=True)
+        self.load_failure_cache(pdf_output_folder)
 
         # Create the task queue
         task_queue = Queue()
@@ -90,6 +116,7 @@ class PdfConverter:
         for worker in workers:
             worker.join()
 
+        self.save_failure_cache()
         os.chdir(curdir)
 
     def convert_single_file(self, file_path):
@@ -107,7 +134,9 @@ class PdfConverter:
         pdf_output_path = os.path.join(output_dir, basename.replace('.html', '.pdf'))
 
         # Convert the single file
-        converted = self.convert_file(file_path, docx_output_path, pdf_output_path, self.docxArgs, self.pdfArgs)
+        self.load_failure_cache(output_dir)
+        converted = self.process_file_with_retries(file_path, docx_output_path, pdf_output_path, self.docxArgs, self.pdfArgs)
+        self.save_failure_cache()
 
         os.chdir(curdir)
 
@@ -128,22 +157,162 @@ class PdfConverter:
             task_queue.task_done()
 
     def process_file_with_retries(self, html_file_path, docx_output_path, pdf_output_path, docxArgs, pdfArgs):
-        """Process a file conversion with retries."""
-        success = self.convert_file(html_file_path, docx_output_path, pdf_output_path, docxArgs, pdfArgs)
-        if not success:
-            try:
-                question_id, _ = Util.html_to_question(html_file_path)
-                self.logger.debug(f"Recompressing the images and retrying pdf convert for question id {question_id} html file path {html_file_path}")
-                # Pass recompress formats from config
-                formats = self.config.recompress_image_formats if isinstance(self.config.recompress_image_formats, list) else ["all"]
-                ImageUtil.recompress_images(question_id=question_id, images_dir=self.images_dir, formats=formats)
-                success = self.convert_file(html_file_path, docx_output_path, pdf_output_path, docxArgs, pdfArgs)
-            except Exception as e:
-                self.logger.debug(f"EXCEPTION Recompressing the images and retrying pdf convert {e}")
+        """Process a file conversion, fixing only the asset named in the error before retrying.
+        
+        Files that failed in a previous run and haven't changed since are skipped or
+        sent to the degraded renderer, depending on config.pdf_failure_action.
+        """
+        self.last_errors.pop(html_file_path, None)
+
+        if self.is_known_failure(html_file_path):
+            action = self.config.pdf_failure_action
+            if action == "skip":
+                self.logger.warning(f"Skipping known pdf failure {html_file_path}")
                 return False
-        return success  # All retries failed
+            if action == "degraded":
+                self.logger.warning(f"Known pdf failure, using degraded renderer {html_file_path}")
+                return self.convert_file_degraded(html_file_path, docx_output_path, pdf_output_path, docxArgs, pdfArgs)
+
+        success = self.convert_file(html_file_path, docx_output_path, pdf_output_path, docxArgs, pdfArgs)
+        if success:
+            self.clear_failure(html_file_path)
+            return True
+
+        error = self.last_errors.get(html_file_path, "")
+        degraded = False
+        try:
+            if self.is_construct_error(error):
+                self.logger.debug(f"Content error in {html_file_path}, retrying with degraded renderer")
+            else:
+                failing_assets = self.find_failing_assets(error)
+                if failing_assets:
+                    self.logger.debug(f"Fixing {len(failing_assets)} failing image(s) and retrying pdf convert for {html_file_path}")
+                    fixed = [asset for asset in failing_assets if self.fix_asset(html_file_path, asset)]
+                else:
+                    question_id, _ = Util.html_to_question(html_file_path)
+                    self.logger.debug(f"No failing image found in error, recompressing the images for question id {question_id} html file path {html_file_path}")
+                    fixed = self.recompress_question_images(question_id)
+
+                if fixed:
+                    success = self.convert_file(html_file_path, docx_output_path, pdf_output_path, docxArgs, pdfArgs)
+                    error = self.last_errors.get(html_file_path, error)
+
+            if not success and self.config.pdf_failure_action == "degraded":
+                degraded = True
+                success = self.convert_file_degraded(html_file_path, docx_output_path, pdf_output_path, docxArgs, pdfArgs)
+        except Exception as e:
+            self.logger.debug(f"EXCEPTION Recovering failed pdf convert {e}")
+            success = False
+
+        # A page that only renders degraded stays known-bad so the next run goes straight to the fallback
+        if success and not degraded:
+            self.clear_failure(html_file_path)
+        else:
+            self.record_failure(html_file_path, error)
+        return success
 
-    def convert_file(self, html_file_path, docx_output_path, pdf_output_path, docxArgs, pdfArgs):
+    #region failure recovery
+    def is_construct_error(self, error):
+        return any(marker in error for marker in PdfConverter.CONSTRUCT_ERROR_MARKERS)
+
+    def find_failing_assets(self, error):
+        """Return paths of images in images_dir that are referenced by the error output."""
+        assets = []
+        for match in PdfConverter.IMAGE_ERROR_PATTERN.findall(error):
+            asset_path = os.path.join(self.images_dir, os.path.basename(match.replace('\\', '/')))
+            if os.path.exists(asset_path) and asset_path not in assets:
+                assets.append(asset_path)
+        return assets
+
+    def fix_asset(self, html_file_path, asset_path):
+        """Recompress a single image and point the html at the new file if it was converted."""
+        new_path = ImageUtil.recompress_image(asset_path, ["all"])
+        if new_path == asset_path:
+            # Unsupported (e.g. svg) or unreadable, rewriting it won't change the outcome
+            return asset_path.lower().endswith(('.png', '.jpg', '.jpeg'))
+
+        old_name = os.path.basename(asset_path)
+        new_name = os.path.basename(new_path)
+        with open(html_file_path, 'r', encoding="utf-8") as file:
+            html = file.read()
+        with open(html_file_path, 'w', encoding="utf-8") as file:
+            file.write(html.replace(old_name, new_name))
+        return True
+
+    def recompress_question_images(self, question_id):
+        # The manifest is only rescanned when the images directory changed
+        filenames = list(Util.get_asset_manifest(self.images_dir).get(Util.qstr(question_id), []))
+
+        if not filenames:
+            return False
+
+        # Pass recompress formats from config
+        formats = self.config.recompress_image_formats if isinstance(self.config.recompress_image_formats, list) else ["all"]
+        ImageUtil.recompress_images(question_id=question_id, images_dir=self.images_dir, formats=formats, filenames=filenames)
+        return True
+
+    def convert_file_degraded(self, html_file_path, docx_output_path, pdf_output_path, docxArgs, pdfArgs):
+        """Convert a copy of the page without images, videos and tex math."""
+        with open(html_file_path, 'r', encoding="utf-8") as file:
+            html = file.read()
+
+        html = re.sub(r"<img\b[^>]*>", "", html, flags=re.IGNORECASE)
+        html = re.sub(r"<(svg|video)\b.*?</\1>", "", html, flags=re.IGNORECASE | re.DOTALL)
+
+        # A docx kept from the failed attempt would otherwise be reused as is
+        if os.path.exists(docx_output_path):
+            os.remove(docx_output_path)
+
+        fd, degraded_path = tempfile.mkstemp(suffix=".html", prefix="._degraded-", dir=os.path.dirname(pdf_output_path))
+        try:
+            with os.fdopen(fd, 'w', encoding="utf-8") as file:
+                file.write(html)
+            return self.convert_file(degraded_path, docx_output_path, pdf_output_path, docxArgs, pdfArgs, source_format='html')
+        finally:
+            os.remove(degraded_path)
+            self.last_errors.pop(degraded_path, None)
+
+    def load_failure_cache(self, pdf_output_folder):
+        self.failure_cache_path = os.path.join(pdf_output_folder, PdfConverter.FAILURE_CACHE_FILENAME)
+        self.failure_cache = {}
+        if os.path.exists(self.failure_cache_path):
+            try:
+                with open(self.failure_cache_path, 'r') as file:
+                    self.failure_cache = json.load(file)
+            except (json.JSONDecodeError, OSError) as e:
+                self.logger.warning(f"Ignoring unreadable pdf failure cache {self.failure_cache_path}: {e}")
+
+    def save_failure_cache(self):
+        if not self.failure_cache_path:
+            return
+        with self.failure_cache_lock:
+            if not self.failure_cache and not os.path.exists(self.failure_cache_path):
+                return
+            with open(self.failure_cache_path, 'w') as file:
+                json.dump(self.failure_cache, file, indent=4)
+
+    def is_known_failure(self, html_file_path):
+        if self.config.pdf_failure_action == "retry":
+            return False
+        with self.failure_cache_lock:
+            entry = self.failure_cache.get(os.path.basename(html_file_path))
+        # An edited or re-downloaded page gets a fresh attempt
+        return entry is not None and entry.get('mtime') == os.path.getmtime(html_file_path)
+
+    def record_failure(self, html_file_path, error):
+        with self.failure_cache_lock:
+            self.failure_cache[os.path.basename(html_file_path)] = {
+                'mtime': os.path.getmtime(html_file_path),
+                'error': error[-2000:]
+            }
+
+    def clear_failure(self, html_file_path):
+        with self.failure_cache_lock:
+            self.failure_cache.pop(os.path.basename(html_file_path), None)
+
+    #endregion failure recovery
+
+    def convert_file(self, html_file_path, docx_output_path, pdf_output_path, docxArgs, pdfArgs, source_format='html+tex_math_dollars-tex_math_double_backslash'):
         self.logger.info(f"Converting: {html_file_path}")
 
         # Check if PDF exists and whether to overwrite
@@ -160,11 +329,12 @@ class PdfConverter:
                 pypandoc.convert_file(
                     source_file=html_file_path,
                     to='docx',
-                    format='html+tex_math_dollars-tex_math_double_backslash',
+                    format=source_format,
                     outputfile=docx_output_path,
                     extra_args=docxArgs)
             except Exception as e:
                 self.logger.error(f"ERROR converting to DOCX: {docx_output_path}\n{str(e)}")
+                self.last_errors[html_file_path] = str(e)
                 success = False
 
         # Previous step was successful and docx file exists
@@ -181,6 +351,7 @@ class PdfConverter:
                     extra_args=pdfArgs)
             except Exception as e:
                 self.logger.error(f"ERROR converting to PDF: {pdf_output_path}\n{str(e)}")
+                self.last_errors[html_file_path] = str(e)
                 success = False
 
         # Remove the DOCX file after PDF conversion (unless keep_docx is True)
@@ -0,0 +1,144 @@
+import hashlib
+import html
+import json
+import os
+import re
+import sqlite3
+
+from logging import Logger
+from threading import Lock
+
+from models.Question import Question
+from models.QuestionContent import QuestionContent
+from utils.Config import Config
+
+class SearchIndex:
+    """Full-text index of the rendered questions, an SQLite FTS5 table in the save directory.
+
+    Fed from QuestionContent while the pages are rendered, a question whose text didn't change is not written again.
+    The words of titles, tags, statements and hints are also exported to a script for the search box of questions/index.html.
+    """
+    FILENAME = "search_index.db"
+    SCRIPT_FILENAME = "search_index.js"
+    TAG = re.compile(r"<[^>]+>")
+    WORD = re.compile(r"[a-z0-9][a-z0-9+#-]+")
+    STOP_WORDS = frozenset("""an and are as at be by can each for from given has have if in into is it its not of on
+        one or that the their then there these this to was which will with you your""".split())
+
+    def __init__(
+        self,
+        config: Config,
+        logger: Logger):
+
+        self.config = config
+        self.logger = logger
+        self.filepath = os.path.join(self.config.save_directory, SearchIndex.FILENAME)
+        self.lock = Lock()
+        self.connection = None
+
+    #region persistence
+    def connect(self):
+        if self.connection is not None:
+            return self.connection
+
+        os.makedirs(self.config.save_directory, exist_ok=True)
+        connection = sqlite3.connect(self.filepath, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS questions USING fts5(
+            title, tags, content, hints, solution, tokenize='porter unicode61')""")
+        connection.execute("""CREATE TABLE IF NOT EXISTS documents(
+            question_id INTEGER PRIMARY KEY, slug TEXT, difficulty TEXT, path TEXT, hash TEXT)""")
+
+        self.connection = connection
+        return connection
+
+    def close(self):
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+    #endregion persistence
+
+    @staticmethod
+    def to_text(content):
+        return html.unescape(SearchIndex.TAG.sub(" ", content or ""))
+
+    def update_question(self, question: Question, question_content: QuestionContent, filepath):
+        """Index the question rendered at filepath, skipped when the indexed text and path are the same."""
+        fields = (
+            question.title,
+            " ".join(question_content.topic_tags),
+            SearchIndex.to_text(question_content.content),
+            SearchIndex.to_text("\n".join(question_content.hints or [])),
+            question_content.solution or "")
+        content_hash = hashlib.sha1("\0".join(fields + (question_content.difficulty or "",)).encode("utf-8")).hexdigest()
+        path = os.path.relpath(filepath, self.config.questions_directory).replace(os.sep, "/")
+
+        with self.lock:
+            connection = self.connect()
+            row = connection.execute("SELECT hash, path FROM documents WHERE question_id = ?", (question.id,)).fetchone()
+
+            # Pages rendered in a company folder don't replace the question folder one
+            canonical = os.path.dirname(path).isdigit()
+            if row and row[0] == content_hash and (row[1] == path or not canonical):
+                return
+
+            with connection:
+                connection.execute("DELETE FROM questions WHERE rowid = ?", (question.id,))
+                connection.execute(
+                    "INSERT INTO questions(rowid, title, tags, content, hints, solution) VALUES (?, ?, ?, ?, ?, ?)",
+                    (question.id,) + fields)
+                connection.execute(
+                    "INSERT OR REPLACE INTO documents(question_id, slug, difficulty, path, hash) VALUES (?, ?, ?, ?, ?)",
+                    (question.id, question.slug, question_content.difficulty, path if canonical or not row else row[1], content_hash))
+
+        self.logger.debug(f"Search index updated {question.id}")
+
+    def search(self, query, limit=20):
+        """Questions matching an FTS5 query, best match first, as (question id, title, path relative to the questions directory, snippet)."""
+        sql = """SELECT questions.rowid, questions.title, documents.path,
+                snippet(questions, -1, '[', ']', '...', 12)
+            FROM questions JOIN documents ON documents.question_id = questions.rowid
+            WHERE questions MATCH ?
+            ORDER BY bm25(questions, 10.0, 5.0, 1.0, 2.0, 1.0)
+            LIMIT ?"""
+
+        with self.lock:
+            connection = self.connect()
+            try:
+                return connection.execute(sql, (query, limit)).fetchall()
+            except sqlite3.OperationalError:
+                # Not a valid FTS5 query, search the words as they are
+                words = " ".join('"' + word.replace('"', '""') + '"' for word in query.split())
+                if not words:
+                    return []
+                return connection.execute(sql, (words, limit)).fetchall()
+
+    def export_script(self):
+        """Write the word index read by the search box of questions/index.html, solutions are left out to keep it small."""
+        docs = []
+        words = {}
+
+        with self.lock:
+            connection = self.connect()
+            rows = connection.execute("""SELECT questions.rowid, questions.title, questions.tags, questions.content, questions.hints,
+                    documents.difficulty, documents.path
+                FROM questions JOIN documents ON documents.question_id = questions.rowid
+                ORDER BY questions.rowid""").fetchall()
+
+        for question_id, title, tags, content, hints, difficulty, path in rows:
+            doc = len(docs)
+            docs.append([question_id, title, difficulty, path])
+            for word in set(SearchIndex.WORD.findall(f"{title} {tags} {content} {hints}".lower())):
+                if word not in SearchIndex.STOP_WORDS and not word.isdigit():
+                    words.setdefault(word, []).append(doc)
+
+        script_path = os.path.join(self.config.questions_directory, SearchIndex.SCRIPT_FILENAME)
+        os.makedirs(self.config.questions_directory, exist_ok=True)
+        with open(script_path, "w", encoding="utf-8") as file:
+            file.write("var SEARCH_INDEX = ")
+            json.dump({"docs": docs, "words": words}, file, separators=(",", ":"))
+            file.write(";\n")
+
+        self.logger.debug(f"Search script written {script_path}, {len(docs)} questions")
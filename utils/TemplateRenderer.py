@@ -0,0 +1,42 @@
+import os
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+from utils.Constants import Constants
+from utils.Util import Util
+
+class TemplateRenderer:
+    ENVIRONMENT = None
+
+    @staticmethod
+    def create_environment():
+        # Compiled templates are kept next to the config so later runs skip parsing them
+        bytecode_dir = os.path.join(Constants.OS_ROOT, ".leetcode-scraper", "templates")
+        os.makedirs(bytecode_dir, exist_ok=True)
+
+        environment = Environment(
+            loader=FileSystemLoader(Constants.TEMPLATES_DIR),
+            bytecode_cache=FileSystemBytecodeCache(bytecode_dir),
+            trim_blocks=True,
+            lstrip_blocks=True,
+            auto_reload=False)
+
+        environment.filters['qhtml'] = Util.qhtml
+        environment.filters['sanitize_title'] = Util.sanitize_title
+        environment.globals['leetcode_url'] = Constants.LEETCODE_URL
+        environment.globals['html_header'] = Constants.HTML_HEADER
+
+        return environment
+
+    @staticmethod
+    def render(template_name, **context) -> str:
+        """Render a template to a string, used for fragments embedded in a page."""
+        template = TemplateRenderer.ENVIRONMENT.get_template(template_name)
+        return template.render(**context)
+
+    @staticmethod
+    def render_to_file(template_name, filepath, **context):
+        """Stream a template into a file without building the whole page in memory."""
+        template = TemplateRenderer.ENVIRONMENT.get_template(template_name)
+        template.stream(**context).dump(filepath, encoding="utf-8")
+
+TemplateRenderer.ENVIRONMENT = TemplateRenderer.create_environment()
@@ -1,3 +1,5 @@
+import hashlib
+import importlib.util
 from logging import Logger
 import logging
 from logging.handlers import RotatingFileHandler
@@ -5,9 +7,28 @@ import os
 import re
 import shutil
 import sys
+from threading import Lock
 import markdown
+from bs4 import BeautifulSoup
+
+from utils.Constants import Constants
+
+HTML_PARSER = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
 
 class Util:
+    # Characters not allowed in file names, replaced by a space
+    TITLE_TRANSLATION = str.maketrans({character: ' ' for character in ':?|></\\'})
+    MARKDOWN_EXTENSIONS = ['extra', 'mdx_math', 'nl2br']
+    MARKDOWN_CONVERTER = None
+    MARKDOWN_LOCK = Lock()
+    # Converted html keyed by a hash of the markdown, shared with the api cache
+    MARKDOWN_CACHE = None
+    # Per directory (mtime, filenames grouped by question id) of images and videos
+    ASSET_MANIFESTS = {}
+    ASSET_MANIFESTS_LOCK = Lock()
+    # Linux ioctl request for cloning a file
+    FICLONE = 0x40049409
+
     @staticmethod
     def clear():
         current_os = sys.platform
@@ -21,12 +42,16 @@ class Util:
 
 
     @staticmethod
-    def copy_question_file(question_id, question_title, dest_dir, questions_dir, copy_pdf = True, copy_videos = False):
+    def copy_question_file(question_id, question_title, dest_dir, questions_dir, copy_pdf = True, copy_videos = False, link_method = "copy"):
         # Calculate the subfolder based on question ID (e.g., 0100, 0200, etc.)
         folder_number = ((question_id - 1) // 100 + 1) * 100
         folder_name = f"{folder_number:04d}"
         question_subfolder = os.path.join(questions_dir, folder_name)
-        
+
+        return Util.link_question_files(question_id, question_title, question_subfolder, dest_dir, copy_pdf, copy_videos, link_method)
+
+    @staticmethod
+    def link_question_files(question_id, question_title, question_subfolder, dest_dir, copy_pdf = True, copy_videos = False, link_method = "copy"):
         question_filename = Util.qhtml(question_id, question_title)
         question_filepath = os.path.join(question_subfolder, question_filename)
 
@@ -38,7 +63,7 @@ class Util:
 
         # Copy html
         destination_filepath = os.path.join(dest_dir, question_filename)
-        shutil.copy2(question_filepath, destination_filepath)
+        Util.materialize_file(question_filepath, destination_filepath, link_method)
 
         question_id_str = Util.qstr(question_id)
 
@@ -48,11 +73,10 @@ class Util:
         
         if os.path.exists(images_dir):
             os.makedirs(dest_images_dir, exist_ok=True)
-            for filename in os.listdir(images_dir):
-                if filename.startswith(question_id_str):
-                    source_imagepath = os.path.join(images_dir, filename)
-                    dest_imagepath = os.path.join(dest_images_dir, filename)
-                    shutil.copy2(source_imagepath, dest_imagepath)
+            for filename in Util.get_asset_manifest(images_dir).get(question_id_str, []):
+                source_imagepath = os.path.join(images_dir, filename)
+                dest_imagepath = os.path.join(dest_images_dir, filename)
+                Util.materialize_file(source_imagepath, dest_imagepath, link_method)
 
         # Copy pdf
         if copy_pdf:
@@ -66,7 +90,7 @@ class Util:
                 destination_filepath = os.path.join(dest_pdf_dir, f"{question_basename}.pdf")
                 
                 if os.path.exists(question_filepath):
-                    shutil.copy2(question_filepath, destination_filepath)
+                    Util.materialize_file(question_filepath, destination_filepath, link_method)
 
         # Copy videos
         if copy_videos:
@@ -75,14 +99,76 @@ class Util:
             
             if os.path.exists(videos_dir):
                 os.makedirs(dest_videos_dir, exist_ok=True)
-                for filename in os.listdir(videos_dir):
-                    if filename.startswith(question_id_str):
-                        source_imagepath = os.path.join(videos_dir, filename)
-                        dest_imagepath = os.path.join(dest_videos_dir, filename)
-                        shutil.copy2(source_imagepath, dest_imagepath)
+                for filename in Util.get_asset_manifest(videos_dir).get(question_id_str, []):
+                    source_videopath = os.path.join(videos_dir, filename)
+                    dest_videopath = os.path.join(dest_videos_dir, filename)
+                    Util.materialize_file(source_videopath, dest_videopath, link_method)
         
         return True
 
+    @staticmethod
+    def get_asset_manifest(assets_dir):
+        """Filenames of an images or videos directory grouped by question id prefix.
+        
+        The listing is kept in memory and only rescanned when the directory mtime changes.
+        """
+        try:
+            mtime = os.stat(assets_dir).st_mtime_ns
+        except OSError:
+            return {}
+
+        with Util.ASSET_MANIFESTS_LOCK:
+            manifest = Util.ASSET_MANIFESTS.get(assets_dir)
+            if manifest and manifest[0] == mtime:
+                return manifest[1]
+
+        groups = {}
+        for filename in os.listdir(assets_dir):
+            prefix = filename.split('-', 1)[0]
+            groups.setdefault(prefix, []).append(filename)
+
+        with Util.ASSET_MANIFESTS_LOCK:
+            Util.ASSET_MANIFESTS[assets_dir] = (mtime, groups)
+        return groups
+
+    @staticmethod
+    def materialize_file(src_path, dest_path, link_method = "copy"):
+        """Place src_path at dest_path as a hardlink, reflink or symlink, falling back to a copy.
+        
+        link_method: "copy", "hardlink", "reflink" or "symlink"
+        """
+        if os.path.lexists(dest_path):
+            # Already linked to the same file, nothing to write
+            if link_method != "copy" and os.path.exists(dest_path) and os.path.samefile(src_path, dest_path):
+                return
+            os.remove(dest_path)
+
+        try:
+            if link_method == "hardlink":
+                os.link(src_path, dest_path)
+                return
+            elif link_method == "symlink":
+                os.symlink(os.path.relpath(src_path, os.path.dirname(dest_path)), dest_path)
+                return
+            elif link_method == "reflink":
+                Util.reflink_file(src_path, dest_path)
+                shutil.copystat(src_path, dest_path)
+                return
+        except (OSError, ImportError):
+            # Different devices, no filesystem support or no permission to link
+            if os.path.lexists(dest_path):
+                os.remove(dest_path)
+
+        shutil.copy2(src_path, dest_path)
+
+    @staticmethod
+    def reflink_file(src_path, dest_path):
+        # Copy-on-write clone, only available on Linux filesystems like btrfs and xfs
+        import fcntl
+
+        with open(src_path, "rb") as src, open(dest_path, "wb") as dest:
+            fcntl.ioctl(dest.fileno(), Util.FICLONE, src.fileno())
+
     @staticmethod
     def html_to_question(filepath):
         # get the file name from full path
@@ -126,24 +212,52 @@ class Util:
         # Replace \space with a regular space
         return re.sub(r'\\space', ' ', content)
 
+    @staticmethod
+    def set_markdown_cache(cache):
+        Util.MARKDOWN_CACHE = cache
+
+    @staticmethod
+    def markdown_cache_key(content):
+        digest = hashlib.sha1(content.encode()).hexdigest()
+        return f"markdown-{'-'.join(Util.MARKDOWN_EXTENSIONS)}-{digest}"
+
     @staticmethod
     def markdown_with_math(content):
+        key = None
+        if Util.MARKDOWN_CACHE is not None:
+            key = Util.markdown_cache_key(content)
+            converted = Util.MARKDOWN_CACHE.get(key=key)
+            if converted is not None:
+                return converted
+
         content = Util.convert_display_math_to_inline(content)
         content = Util.clean_tex_math(content)
         content = content.replace("\\n", "\n")
 
         # Convert Markdown to HTML and ensure TeX math is not escaped
-        converted = markdown.markdown(
-            content,
-            extensions=['extra', 'mdx_math', 'nl2br'])
+        # The extension pipeline is built once, a Markdown instance isn't thread safe so calls are serialized
+        with Util.MARKDOWN_LOCK:
+            if Util.MARKDOWN_CONVERTER is None:
+                Util.MARKDOWN_CONVERTER = markdown.Markdown(extensions=Util.MARKDOWN_EXTENSIONS)
+            converted = Util.MARKDOWN_CONVERTER.reset().convert(content)
+
+        if key:
+            Util.MARKDOWN_CACHE.set(key=key, value=converted)
         
         return converted
 
 
     @staticmethod
-    def replace_filename(str):
-        numDict = {':': ' ', '?': ' ', '|': ' ', '>': ' ', '<': ' ', '/': ' ', '\\': ' '}
-        return numDict[str.group()]
+    def parse_html_body(body_html):
+        """Parse the body of a page once, with lxml when it is available."""
+        return BeautifulSoup(f"<body>{body_html}</body>", HTML_PARSER)
+
+    @staticmethod
+    def render_html_page(content_soup):
+        """Compact page html: the static header is prepended as text instead of being parsed for every page."""
+        body = content_soup.body
+        body_html = body.decode_contents() if body else str(content_soup)
+        return f"""<!DOCTYPE html><html lang="en">{Constants.HTML_HEADER}<body>{body_html}</body></html>"""
 
     @staticmethod
     def get_cache_path(save_path, category, filename):
@@ -171,4 +285,4 @@ class Util:
 
     @staticmethod
     def sanitize_title(title):
-        return re.sub(r'[:?|></\\]', Util.replace_filename, title)
\ No newline at end of file
+        return title.translate(Util.TITLE_TRANSLATION)
\ No newline at end of file